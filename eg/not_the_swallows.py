@@ -6,6 +6,7 @@
 #
 
 from os.path import realpath, dirname, join
+import random
 import sys
 
 # get the ../src/ directory onto the Python module search path
@@ -13,38 +14,48 @@ sys.path.insert(0, join(dirname(realpath(sys.argv[0])), '..', 'src'))
 
 # now we can:
 from swallows.engine.events import Publisher
-from swallows.engine.objects import Location, ProperLocation, Male, Female
+from swallows.engine.objects import (
+    Location, ProperLocation, Male, Female, World
+)
 
 ### world ###
 
-main_street = ProperLocation("Main Street", noun="street")
-butchers = Location("butcher's", noun="store")
-bakery = Location("bakery", noun="store")
-candlestick_factory = Location("candlestick factory", noun="building")
-
-main_street.set_exits(butchers, bakery, candlestick_factory)
-butchers.set_exits(main_street)
-bakery.set_exits(main_street)
-candlestick_factory.set_exits(main_street)
-
-downtown = (main_street, butchers, bakery, candlestick_factory)
-
 class Tweedle(Male):
     def live(self):
         self.wander()
 
-tweedledee = Tweedle('Tweedledee')
-tweedledum = Tweedle('Tweedledum')
+
+def build_downtown(rng=random):
+    main_street = ProperLocation("Main Street", noun="street")
+    butchers = Location("butcher's", noun="store")
+    bakery = Location("bakery", noun="store")
+    candlestick_factory = Location("candlestick factory", noun="building")
+
+    main_street.set_exits(butchers, bakery, candlestick_factory)
+    butchers.set_exits(main_street)
+    bakery.set_exits(main_street)
+    candlestick_factory.set_exits(main_street)
+
+    downtown = (main_street, butchers, bakery, candlestick_factory)
+
+    tweedledee = Tweedle('Tweedledee')
+    tweedledum = Tweedle('Tweedledum')
+
+    return World(
+        setting=downtown,
+        characters=(tweedledee, tweedledum),
+        downtown=downtown,
+    )
+
 
 ### main ###
 
-publisher = Publisher(
-    characters=(
-        tweedledee,
-        tweedledum,
-    ),
-    setting=downtown,
-    title="TERRIBLE EXAMPLE STORY",
-    #debug=True,
-)
-publisher.publish()
+if __name__ == '__main__':
+    world = build_downtown()
+    publisher = Publisher(
+        characters=world.characters,
+        setting=world.downtown,
+        title="TERRIBLE EXAMPLE STORY",
+        #debug=True,
+    )
+    publisher.publish()
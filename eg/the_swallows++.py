@@ -13,49 +13,53 @@ sys.path.insert(0, join(dirname(realpath(sys.argv[0])), '..', 'src'))
 # now we can import the classes we will work with
 from swallows.engine.events import Publisher
 from swallows.story.characters import MaleCharacter
-from swallows.story.world import (
-    alice, bob, house, upstairs_hall,
-    revolver, brandy, dead_body
-)
+from swallows.story.world import build_world
 from swallows.engine.objects import (
     ProperContainer, Item, Location
 )
 
-# we extend the world of The Swallows by adding a new character.
-# note that we have to inform the new character of certain important objects
-# in the world are, so that he can react sensibly to them.
-# (you *can* pass other objects here, for example 'revolver=brandy', in which
-# case the character will act fairly nonsensibly, threatening other characters
-# with the bottle of brandy and so forth)
-fred = MaleCharacter('Fred',
-    revolver=revolver,
-    brandy=brandy,
-    dead_body=dead_body,
-)
 
-# we extend the world by adding new locations and objects
-# note that locations exited-to and from must be imported from swallows.story.world (above)
-# "Location" is imported from swallows.engine.objects
-freds_office = Location("Fred's office")
-freds_office.set_exits(upstairs_hall)
+def build_fanfic_world():
+    # we start with a fresh copy of the world of The Swallows.
+    world = build_world()
+
+    # we extend the world of The Swallows by adding a new character.
+    # note that we have to inform the new character of certain important
+    # objects in the world are, so that he can react sensibly to them.
+    # (you *can* pass other objects here, for example 'revolver=world.brandy',
+    # in which case the character will act fairly nonsensibly, threatening
+    # other characters with the bottle of brandy and so forth)
+    fred = MaleCharacter('Fred',
+        revolver=world.revolver,
+        brandy=world.brandy,
+        dead_body=world.dead_body,
+    )
+    world.fred = fred
+    world.characters += (fred,)
 
-upstairs_hall.set_exits(freds_office) # adds to existing (unknown) exits
+    # we extend the world by adding new locations and objects
+    # note that locations exited-to and from are attributes of the world
+    # "Location" is imported from swallows.engine.objects
+    freds_office = Location("Fred's office")
+    freds_office.set_exits(world.upstairs_hall)
 
-# we extend the world by adding some Objects
-# "ProperContainer" and "Item" are imported from swallows.engine.objects
-desk = ProperContainer("Fred's desk", location=freds_office)
-pencils = Item('box of pencils', location=desk)
+    world.upstairs_hall.set_exits(freds_office) # adds to existing (unknown) exits
+
+    # we extend the world by adding some Objects
+    # "ProperContainer" and "Item" are imported from swallows.engine.objects
+    desk = ProperContainer("Fred's desk", location=freds_office)
+    pencils = Item('box of pencils', location=desk)
+
+    return world
 
 
 ### main ###
 
+world = build_fanfic_world()
+
 publisher = Publisher(
-    characters=(
-        alice,
-        bob,
-        fred,
-    ),
-    setting=house,
+    characters=world.characters,
+    setting=world.house,
     title="My _The Swallows_ Fanfic",
     #debug=True,
 )
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+
+#
+# benchmark.py: measures how fast the engine is.
+#
+# For each of a number of worlds, this separately times:
+#
+# - simulation: actor turns (calls to live()) per second
+# - EventCollector.dedup: events per second
+# - Event.__str__: events rendered per second
+# - Editor.publish: paragraphs per second
+#
+# Everything is run from a fixed seed, so two runs of the same code do the
+# same work.  With --output the results are written as JSON, and with
+# --compare they are shown next to the results in an earlier JSON file,
+# so that an engine change can be judged on numbers.
+#
+
+import imp
+import json
+from optparse import OptionParser
+from os.path import realpath, dirname, join
+import random
+import sys
+from timeit import default_timer as timer
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(sys.argv[0])), '..', 'src'))
+
+from swallows.engine.events import Publisher, EventCollector, Editor
+from swallows.engine.sinks import NullSink
+from swallows.story.generator import build_estate
+from swallows.story.world import build_world
+
+# the downtown of eg/not_the_swallows.py
+not_the_swallows = imp.load_source('not_the_swallows',
+    join(dirname(realpath(sys.argv[0])), '..', 'eg', 'not_the_swallows.py')
+)
+
+
+WORLDS = (
+    ('house', build_world),
+    ('downtown', not_the_swallows.build_downtown),
+    ('estate-100', lambda rng: build_estate(rng, rooms=100, characters=10)),
+    ('estate-1000', lambda rng: build_estate(rng, rooms=1000, characters=100)),
+    ('estate-5000', lambda rng: build_estate(rng, rooms=5000, characters=500)),
+)
+
+
+### benchmarks ###
+
+class CountingEditor(Editor):
+    def __init__(self, *args, **kwargs):
+        Editor.__init__(self, *args, **kwargs)
+        self.paragraphs = 0
+
+    def publish_paragraph(self, paragraph_events):
+        self.paragraphs += 1
+        Editor.publish_paragraph(self, paragraph_events)
+
+
+def run_once(world_factory, seed, events):
+    """Simulates one chapter of `events` events in a fresh world built
+    from `seed`, then dedups, renders and edits it, timing each part.
+    Returns a dict mapping measurements to rates (things per second.)
+
+    """
+    rng = random.Random(seed)
+    world = world_factory(rng)
+    publisher = Publisher(
+        characters=world.characters,
+        setting=world.setting,
+        events_per_chapter=events,
+        rng=rng,
+    )
+    collector = EventCollector()
+    publisher.start_chapter(collector)
+    results = {}
+
+    start = timer()
+    turns = publisher.simulate(collector)
+    elapsed = timer() - start
+    results['live_turns_per_sec'] = turns / elapsed
+    results['simulated_events_per_sec'] = len(collector.events) / elapsed
+
+    deduped = EventCollector()
+    deduped.events = list(collector.events)
+    start = timer()
+    deduped.dedup()
+    results['dedup_events_per_sec'] = len(collector.events) / (timer() - start)
+
+    start = timer()
+    for event in deduped.events:
+        str(event)
+    results['render_events_per_sec'] = len(deduped.events) / (timer() - start)
+
+    editor = CountingEditor(deduped, world.characters, rng=rng,
+                            sink=NullSink())
+    start = timer()
+    editor.publish()
+    elapsed = timer() - start
+    results['editor_paragraphs_per_sec'] = editor.paragraphs / elapsed
+
+    return results
+
+
+def run(worlds, seed, events, repeat):
+    """Returns a dict mapping world names to the best rates seen over
+    `repeat` runs (each of which is from the same seed.)
+
+    """
+    results = {}
+    for (name, world_factory) in worlds:
+        best = {}
+        for n in range(repeat):
+            for (key, rate) in run_once(world_factory, seed, events).iteritems():
+                best[key] = max(best.get(key, 0), rate)
+        results[name] = best
+    return results
+
+
+def report(results, baseline=None):
+    for name in sorted(results):
+        print name
+        for key in sorted(results[name]):
+            rate = results[name][key]
+            line = "  %-28s %12.1f" % (key, rate)
+            old_rate = (baseline or {}).get(name, {}).get(key)
+            if old_rate:
+                line += "  (was %12.1f, x%.2f)" % (old_rate, rate / old_rate)
+            print line
+
+
+### main ###
+
+parser = OptionParser()
+parser.add_option("--seed", type="int", default=1, metavar="N",
+                  help="seed to build and run every world from (default: 1)")
+parser.add_option("--events", type="int", default=4000, metavar="N",
+                  help="number of events to simulate per run (default: 4000)")
+parser.add_option("--repeat", type="int", default=3, metavar="N",
+                  help="keep the best of N runs (default: 3)")
+parser.add_option("--worlds", default=None, metavar="NAME[,NAME...]",
+                  help="only benchmark these worlds (default: all of %s)" %
+                       ', '.join(name for (name, factory) in WORLDS))
+parser.add_option("--output", default=None, metavar="FILE",
+                  help="write the results to FILE as JSON")
+parser.add_option("--compare", default=None, metavar="FILE",
+                  help="show the results alongside those in FILE, from "
+                       "an earlier --output")
+(options, args) = parser.parse_args()
+
+worlds = WORLDS
+if options.worlds is not None:
+    names = options.worlds.split(',')
+    worlds = [(name, factory) for (name, factory) in WORLDS if name in names]
+
+results = run(worlds, options.seed, options.events, options.repeat)
+
+baseline = None
+if options.compare is not None:
+    with open(options.compare) as f:
+        baseline = json.load(f)['results']
+report(results, baseline)
+
+if options.output is not None:
+    with open(options.output, 'w') as f:
+        json.dump({
+            'python': sys.version.split()[0],
+            'seed': options.seed,
+            'events': options.events,
+            'repeat': options.repeat,
+            'results': results,
+        }, f, indent=1, sort_keys=True)
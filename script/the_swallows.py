@@ -5,23 +5,218 @@
 # Chris Pressey, Cat's Eye Technologies
 #
 
+from optparse import OptionParser
+import os
 from os.path import realpath, dirname, join
+import random
 import sys
 
 # get the ../src/ directory onto the Python module search path
 sys.path.insert(0, join(dirname(realpath(sys.argv[0])), '..', 'src'))
 
 # now we can import things, like:
-from swallows.engine.events import Publisher
-from swallows.story.world import alice, bob, house
+from swallows.engine.checkpoints import CheckpointingPublisher
+from swallows.engine.events import Publisher, EventCollector
+from swallows.engine.eventlog import EventLog
+from swallows.engine.farm import Farm
+from swallows.engine.sinks import open_sink
+from swallows.engine.stats import Stats
+from swallows.engine.traces import RecordingPublisher, ReplayingPublisher
+from swallows.story.generator import build_world_or_estate
 
 ### main ###
 
-publisher = Publisher(
-    characters=(alice, bob),
-    setting=house,
-    title="Title TBD (Book Four of _The Swallows_ series)",
+TITLE = "Title TBD (Book Four of _The Swallows_ series)"
+
+
+def int_list(option, opt_str, value, parser):
+    setattr(parser.values, option.dest, [int(v) for v in value.split(',')])
+
+
+parser = OptionParser()
+parser.add_option("--workers", type="int", default=1, metavar="N",
+                  help="generate chapters (or, with --output-dir, novels) "
+                       "in a pool of N processes (default: 1, i.e. one "
+                       "after another)")
+parser.add_option("--seed", type="int", default=None, metavar="N",
+                  help="seed the random number generator with N, so "
+                       "that the same novel can be generated again")
+parser.add_option("--chapters", type="string", action="callback",
+                  callback=int_list, default=[18], metavar="N[,N...]",
+                  help="number of chapters (default: 18)")
+parser.add_option("--events-per-chapter", type="string", action="callback",
+                  callback=int_list, default=[810], metavar="N[,N...]",
+                  help="number of events simulated per chapter "
+                       "(default: 810)")
+parser.add_option("--rooms", type="int", default=None, metavar="N",
+                  help="instead of the house, set the novel in a randomly "
+                       "generated estate of N rooms")
+parser.add_option("--cast", type="int", default=100, metavar="N",
+                  help="with --rooms, the number of characters in the "
+                       "estate (default: 100)")
+parser.add_option("--main-cast", type="int", default=None, metavar="N",
+                  help="follow only the first N characters (default: all)")
+parser.add_option("--detail-radius", type="int", default=None, metavar="N",
+                  help="only simulate in full the characters within N "
+                       "moves of a character being followed; the rest "
+                       "just drift about")
+parser.add_option("--max-repeats", type="int", default=None, metavar="N",
+                  help="leave out exchanges in which every two sentences "
+                       "in a row have already been written N times lately")
+parser.add_option("--output-dir", default=None, metavar="DIR",
+                  help="batch mode: write novels into DIR, one for each "
+                       "seed with each combination of --chapters and "
+                       "--events-per-chapter, instead of one novel to "
+                       "standard output.  If DIR already has a manifest "
+                       "from an earlier run, that run is resumed")
+parser.add_option("--novels", type="int", default=1, metavar="N",
+                  help="batch mode: number of seeds to use, counting "
+                       "up from --seed (default: 1)")
+parser.add_option("--output", default='-', metavar="FILE",
+                  help="write the novel to FILE (gzip-compressed if FILE "
+                       "ends in .gz) instead of to standard output")
+parser.add_option("--gzip", action="store_true", default=False,
+                  help="batch mode: write gzip-compressed novels")
+parser.add_option("--stats", default=None, metavar="FILE",
+                  help="write timings and counts for each chapter to FILE, "
+                       "as one line of JSON per chapter")
+parser.add_option("--event-log", action="store_true", default=False,
+                  help="keep each chapter's events in a compact columnar "
+                       "log, for chapters with very many events")
+parser.add_option("--record-traces", default=None, metavar="DIR",
+                  help="save a trace of each chapter's events in DIR")
+parser.add_option("--replay-traces", default=None, metavar="DIR",
+                  help="instead of simulating each chapter, edit the "
+                       "events in the trace saved for it in DIR by "
+                       "--record-traces")
+parser.add_option("--checkpoint-dir", default=None, metavar="DIR",
+                  help="save the state of the world before each chapter, "
+                       "and the text of each chapter, in DIR")
+parser.add_option("--resume", action="store_true", default=False,
+                  help="with --checkpoint-dir, carry on from the first "
+                       "chapter that an earlier run didn't finish")
+parser.add_option("--from-chapter", type="int", default=None, metavar="N",
+                  help="with --checkpoint-dir, write chapter N and the "
+                       "ones after it again, starting from the checkpoint "
+                       "saved before chapter N")
+(options, args) = parser.parse_args()
+
+# the size of the world, as keyword arguments for build_world_or_estate
+world_args = {}
+if options.rooms is not None:
+    if options.rooms < 2:
+        parser.error("--rooms must be at least 2")
+    if options.cast < 1:
+        parser.error("--cast must be at least 1")
+    world_args = {'rooms': options.rooms, 'cast': options.cast}
+
+if options.output_dir is not None:
+    for (option, value) in (('--output', options.output != '-'),
+                            ('--stats', options.stats),
+                            ('--event-log', options.event_log),
+                            ('--record-traces', options.record_traces),
+                            ('--replay-traces', options.replay_traces),
+                            ('--checkpoint-dir', options.checkpoint_dir),
+                            ('--resume', options.resume),
+                            ('--from-chapter', options.from_chapter)):
+        if value:
+            parser.error("%s can't be used with --output-dir" % option)
+    # the size of the world goes into each job's config (and so its name
+    # and the manifest), so that a resumed job builds the same world
+    farm = Farm(options.output_dir, build_world_or_estate, title=TITLE,
+                workers=options.workers, compress=options.gzip,
+                world_keys=('rooms', 'cast'))
+    if options.seed is not None:
+        seeds = range(options.seed, options.seed + options.novels)
+    elif os.path.exists(farm.manifest_path()):
+        # just carry on with the novels already planned, rather than
+        # adding some from another random seed
+        seeds = []
+    else:
+        seed = random.Random().getrandbits(32)
+        seeds = range(seed, seed + options.novels)
+    # only the options which were given, so that they don't all end up in
+    # the name of every novel
+    extras = dict(world_args)
+    if options.main_cast is not None:
+        extras['main_cast'] = options.main_cast
+    if options.detail_radius is not None:
+        extras['detail_radius'] = options.detail_radius
+    if options.max_repeats is not None:
+        extras['max_repeats'] = options.max_repeats
+    configs = [dict(extras, chapters=chapters, events_per_chapter=events)
+               for chapters in options.chapters
+               for events in options.events_per_chapter]
+    try:
+        resumed = farm.plan(seeds, configs)
+    except ValueError as e:
+        parser.error(str(e))
+    if resumed:
+        sys.stderr.write("resuming %s (%d novels, %d left to write)\n" %
+                         (farm.manifest_path(), len(farm.jobs),
+                          len(farm.pending_jobs())))
+    farm.run()
+    sys.exit(0)
+
+if len(options.chapters) > 1 or len(options.events_per_chapter) > 1:
+    parser.error("lists of --chapters or --events-per-chapter need --output-dir")
+
+rng = random.Random(options.seed)
+world = build_world_or_estate(rng=rng, **world_args)
+
+stats = None
+if options.stats is not None:
+    stats = Stats(jsonl=open(options.stats, 'w'))
+
+main_characters = None
+if options.main_cast is not None:
+    main_characters = world.characters[:options.main_cast]
+
+if options.record_traces is not None and options.replay_traces is not None:
+    parser.error("--record-traces and --replay-traces can't be used together")
+if options.checkpoint_dir is not None:
+    if options.record_traces is not None or options.replay_traces is not None:
+        parser.error("--checkpoint-dir can't be used with --record-traces "
+                     "or --replay-traces")
+    if options.workers > 1:
+        parser.error("--checkpoint-dir can't be used with --workers, since "
+                     "checkpoints need chapters to be written one after "
+                     "another")
+
+publisher_class = Publisher
+kwargs = {}
+if options.record_traces is not None:
+    publisher_class = RecordingPublisher
+    kwargs['trace_dir'] = options.record_traces
+elif options.replay_traces is not None:
+    publisher_class = ReplayingPublisher
+    kwargs['trace_dir'] = options.replay_traces
+elif options.checkpoint_dir is not None:
+    publisher_class = CheckpointingPublisher
+    kwargs['checkpoint_dir'] = options.checkpoint_dir
+elif options.resume or options.from_chapter is not None:
+    parser.error("--resume and --from-chapter need --checkpoint-dir")
+
+publisher = publisher_class(
+    characters=world.characters,
+    setting=world.setting,
+    title=TITLE,
     #debug=True,
-    #chapters=1,
+    chapters=options.chapters[0],
+    events_per_chapter=options.events_per_chapter[0],
+    workers=options.workers,
+    rng=rng,
+    stats=stats,
+    sink=open_sink(options.output),
+    collector_class=EventLog if options.event_log else EventCollector,
+    main_characters=main_characters,
+    detail_radius=options.detail_radius,
+    max_repeats=options.max_repeats,
+    **kwargs
 )
+if options.from_chapter is not None:
+    publisher.restore(options.from_chapter)
+elif options.resume:
+    publisher.restore()
 publisher.publish()
+publisher.sink.close()
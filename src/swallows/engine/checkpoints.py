@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+import cPickle as pickle
+import os
+import zlib
+
+from swallows.engine.events import Publisher
+from swallows.engine.sinks import MemorySink
+from swallows.util import pickle_world
+
+# Checkpoints: the complete state of the world, and of the random number
+# generator, as it was just before a chapter.  The world is everything
+# reachable from the characters and the setting -- where everyone and
+# everything is, and what each character remembers, desires, and has
+# decided -- so it is saved by pickling them, and compressing the pickle.
+# The Editor's window of recent sentences (see swallows.engine.repetition),
+# if it has one, goes along with them, since it carries over from one
+# chapter to the next too.
+#
+# A CheckpointingPublisher keeps, in its checkpoint directory,
+#
+#   chapter-N.checkpoint  the state just before chapter N
+#   chapter-N.markdown    the text of chapter N, once it has been written
+#
+# and the checkpoint for chapter N+1 is always written before the text of
+# chapter N, so if chapter N's text is there, so is the checkpoint after it.
+# A run which was killed can then be resumed at the first chapter whose
+# text is missing, and any chapter can be written again, from its
+# checkpoint, without writing all the chapters before it again.
+#
+# Only sequential publishing is supported, since when chapters are published
+# in parallel, each starts from the world as it was before the first one.
+
+
+def checkpoint_path(checkpoint_dir, chapter_num):
+    return os.path.join(checkpoint_dir, 'chapter-%d.checkpoint' % chapter_num)
+
+
+def chapter_path(checkpoint_dir, chapter_num):
+    return os.path.join(checkpoint_dir, 'chapter-%d.markdown' % chapter_num)
+
+
+def save_checkpoint(path, characters, setting, rng, repetition=None):
+    # the characters' links to the chapter they were last in (where its
+    # events went, where its stats went, its scheduler, and the Publisher's
+    # rng) are not part of the world, and start_chapter will set them
+    # again anyway.
+    links = [(actor, actor.collector, actor.stats, actor.scheduler, actor.rng)
+             for actor in characters]
+    for actor in characters:
+        actor.collector = None
+        actor.stats = None
+        actor.scheduler = None
+        actor.rng = None
+    try:
+        data = pickle_world({
+            'characters': characters,
+            'setting': setting,
+            'rng_state': rng.getstate(),
+            'repetition': repetition,
+        }, setting)
+    finally:
+        for (actor, collector, stats, scheduler, actor_rng) in links:
+            actor.collector = collector
+            actor.stats = stats
+            actor.scheduler = scheduler
+            actor.rng = actor_rng
+    write_file(path, zlib.compress(data, 1))
+
+
+def write_file(path, data):
+    # write it under another name first, so that a run which is killed
+    # while writing it doesn't leave half a file behind
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.rename(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """Returns a tuple of (characters, setting, rng state, repetition
+    window) saved in the checkpoint at `path`.
+
+    """
+    with open(path, 'rb') as f:
+        state = pickle.loads(zlib.decompress(f.read()))
+    return (state['characters'], state['setting'], state['rng_state'],
+            state.get('repetition'))
+
+
+class CheckpointingPublisher(Publisher):
+    """A Publisher which saves a checkpoint before each chapter, and the
+    text of each chapter, in `checkpoint_dir`, and can be restored from
+    them (see above.)
+
+    """
+    def __init__(self, checkpoint_dir, **kwargs):
+        Publisher.__init__(self, **kwargs)
+        if self.workers > 1:
+            raise ValueError("checkpoints need chapters to be published "
+                             "one after another")
+        self.checkpoint_dir = checkpoint_dir
+        if not os.path.isdir(checkpoint_dir):
+            os.makedirs(checkpoint_dir)
+        # chapters before this one were written by an earlier run
+        self.first_chapter = 1
+
+    def resume_point(self):
+        """Returns the number of the first chapter whose text has not been
+        saved, which is where an interrupted run should be resumed.
+
+        """
+        chapter_num = 1
+        while (chapter_num <= self.chapters and
+               os.path.exists(chapter_path(self.checkpoint_dir, chapter_num))):
+            chapter_num += 1
+        return chapter_num
+
+    def restore(self, chapter_num=None):
+        """Restores the world, and the rng, as they were just before the
+        given chapter (or by default, before the chapter at which an
+        interrupted run should be resumed), so that publish() will start
+        writing from that chapter, using the saved text of the chapters
+        before it.
+
+        """
+        if chapter_num is None:
+            chapter_num = self.resume_point()
+        for n in range(1, chapter_num):
+            if not os.path.exists(chapter_path(self.checkpoint_dir, n)):
+                raise ValueError("can't start at chapter %d; chapter %d "
+                                 "was never written" % (chapter_num, n))
+        if chapter_num > self.chapters:
+            # everything was written; nothing to restore
+            self.first_chapter = chapter_num
+            return
+        (characters, setting, rng_state, repetition) = load_checkpoint(
+            checkpoint_path(self.checkpoint_dir, chapter_num)
+        )
+        self.main_characters = [characters[self.characters.index(main)]
+                                for main in self.main_characters]
+        self.characters = characters
+        self.setting = setting
+        self.rng.setstate(rng_state)
+        if self.repetition is not None and repetition is not None:
+            self.repetition = repetition
+        for actor in characters:
+            actor.rng = self.rng
+        self.first_chapter = chapter_num
+
+    def publish_chapter(self, chapter_num):
+        if chapter_num < self.first_chapter:
+            with open(chapter_path(self.checkpoint_dir, chapter_num)) as f:
+                self.sink.write(f.read())
+            return
+        if chapter_num == 1:
+            save_checkpoint(checkpoint_path(self.checkpoint_dir, 1),
+                            self.characters, self.setting, self.rng,
+                            self.repetition)
+
+        sink = self.sink
+        self.sink = MemorySink()
+        try:
+            Publisher.publish_chapter(self, chapter_num)
+            text = self.sink.getvalue()
+        finally:
+            self.sink = sink
+
+        save_checkpoint(checkpoint_path(self.checkpoint_dir, chapter_num + 1),
+                        self.characters, self.setting, self.rng,
+                        self.repetition)
+        write_file(chapter_path(self.checkpoint_dir, chapter_num), text)
+        self.sink.write(text)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+from array import array
+
+from swallows.engine.events import Event, EventCollector
+
+# A columnar event log.
+#
+# An EventCollector keeps each event as an Event object, with its own
+# participants list; that's a few hundred bytes an event, which is fine for
+# an 810-event chapter but not for a statistics run of a few million.  An
+# EventLog keeps the same information in flat arrays instead:
+#
+#   phrases       the id of each event's phrase (an index into phrase_table)
+#   offsets       where each event's participants start in `participants`;
+#                 offsets[n+1] is where they end, so there is one more
+#                 offset than there are events
+#   participants  the ids of all events' participants, one after another
+#                 (indexes into thing_table)
+#   locations     the id of each event's location (also into thing_table)
+#   excls         1 if the event is an exclamation, 0 if not
+#
+# so an event costs a dozen or so bytes, plus 4 per participant.  The
+# phrase and thing tables hold each phrase, and each actor, only once.
+#
+# An Event object is only made when someone asks for one -- by indexing or
+# iterating over `events`, which is an EventView -- and is a fresh copy each
+# time, which the Editor is free to rewrite.  dedup() works directly on the
+# arrays.  (Who observed each event is not kept; the Editor doesn't use it.)
+
+
+class EventView(object):
+    """A read-only sequence of some of the events in an EventLog, which
+    makes Event objects on demand.  Slicing a view gives another view,
+    without copying anything.
+
+    """
+    def __init__(self, log, start=0, stop=None):
+        self.log = log
+        self.start = start
+        self.stop = stop
+
+    def _stop(self):
+        if self.stop is None:
+            return len(self.log)
+        return min(self.stop, len(self.log))
+
+    def __len__(self):
+        return max(0, self._stop() - self.start)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            (start, stop, step) = index.indices(len(self))
+            assert step == 1, "EventViews can't be sliced with a step"
+            return EventView(self.log, self.start + start, self.start + stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.log.event(self.start + index)
+
+    def __iter__(self):
+        # check the length each time around, so that we can iterate over
+        # the events of a chapter while it is still being simulated
+        n = self.start
+        while n < self._stop():
+            yield self.log.event(n)
+            n += 1
+
+
+class EventLog(EventCollector):
+    """An EventCollector which keeps its events in columns (see above.)
+    `events` is an EventView of all of them, so it can be used anywhere
+    an EventCollector can, including as the source of events for an Editor.
+
+    """
+    def __init__(self, stats=None):
+        self.stats = stats
+        self.phrase_table = []
+        self.phrase_ids = {}
+        self.thing_table = []
+        self.thing_ids = {}
+        self.clear()
+
+    def clear(self):
+        self.phrases = array('i')
+        self.offsets = array('l', [0])
+        self.participants = array('i')
+        self.locations = array('i')
+        self.excls = array('b')
+
+    def phrase_id(self, phrase):
+        id_ = self.phrase_ids.get(phrase)
+        if id_ is None:
+            id_ = len(self.phrase_table)
+            self.phrase_table.append(phrase)
+            self.phrase_ids[phrase] = id_
+        return id_
+
+    def thing_id(self, thing):
+        id_ = self.thing_ids.get(thing)
+        if id_ is None:
+            id_ = len(self.thing_table)
+            self.thing_table.append(thing)
+            self.thing_ids[thing] = id_
+        return id_
+
+    def __len__(self):
+        return len(self.phrases)
+
+    @property
+    def events(self):
+        return EventView(self)
+
+    def collect(self, event):
+        self.phrases.append(self.phrase_id(event.phrase))
+        for participant in event.participants:
+            self.participants.append(self.thing_id(participant))
+        self.offsets.append(len(self.participants))
+        self.locations.append(self.thing_id(event.location))
+        self.excls.append(1 if event.excl else 0)
+        if self.stats is not None:
+            self.stats.count_event(event)
+
+    def event(self, n):
+        """Makes an Event object for the n'th event in the log."""
+        things = self.thing_table
+        participants = [things[id_] for id_ in
+                        self.participants[self.offsets[n]:self.offsets[n + 1]]]
+        event = Event(self.phrase_table[self.phrases[n]], participants,
+                      excl=bool(self.excls[n]))
+        # the participant may have moved on since; we want where it was
+        event.location = things[self.locations[n]]
+        return event
+
+    def drain(self):
+        events = list(self.events)
+        self.clear()
+        return events
+
+    def dedup(self):
+        """Removes, in place, each event which is the same as the one
+        before it (same phrase, participants and excl-ness), without
+        making any Event objects.
+
+        """
+        phrases = self.phrases
+        offsets = self.offsets
+        participants = self.participants
+        locations = self.locations
+        excls = self.excls
+        kept = 0
+        start = 0
+        for n in xrange(len(phrases)):
+            end = offsets[n + 1]
+            if kept > 0:
+                prev = kept - 1
+                if (phrases[prev] == phrases[n] and
+                    excls[prev] == excls[n] and
+                    participants[offsets[prev]:offsets[kept]] ==
+                        participants[start:end]):
+                    start = end
+                    continue
+            if kept != n:
+                # slide this event down over the ones we dropped
+                phrases[kept] = phrases[n]
+                locations[kept] = locations[n]
+                excls[kept] = excls[n]
+                dest = offsets[kept]
+                participants[dest:dest + end - start] = participants[start:end]
+                offsets[kept + 1] = dest + end - start
+            kept += 1
+            start = end
+        del phrases[kept:]
+        del locations[kept:]
+        del excls[kept:]
+        del participants[offsets[kept]:]
+        del offsets[kept + 1:]
+
+    def phrase_counts(self):
+        """Returns a dict mapping each phrase to how many events in the
+        log have it -- a scan over one column, with no Events made.
+
+        """
+        counts = [0] * len(self.phrase_table)
+        for id_ in self.phrases:
+            counts[id_] += 1
+        return dict((self.phrase_table[id_], count)
+                    for (id_, count) in enumerate(counts) if count)
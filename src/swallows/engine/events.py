@@ -1,17 +1,24 @@
 #!/usr/bin/env python
 
+from bisect import bisect_left
+import cPickle as pickle
+from multiprocessing import Pool
 import random
-import sys
+import re
 
-from swallows.util import pick
+from swallows.engine import navigation
+from swallows.engine import peephole
+from swallows.engine.repetition import RepetitionWindow
+from swallows.engine.scheduler import Scheduler
+from swallows.engine.sinks import StreamSink, MemorySink
+from swallows.engine.stats import phase
+from swallows.util import pick, pickle_world
 
 # TODO
 
 # Diction:
 # - Bob is in the dining room & "Bob made his way to the dining room" ->
 #   "Bob wandered around for a bit, then came back to the dining room"
-# - comvert "Bob went to the shed.  Bob saw Alice." into
-#           "Bob went to the shed, where he saw Alice."
 # - a better solution for "Bob was in the kitchen" at the start of a paragraph;
 #   this might include significant memories Bob acquired in the last
 #   paragraph -- such as finding a revolver in the bed
@@ -22,15 +29,65 @@ from swallows.util import pick
 #   i.e. chapter summaries -- that's a little too fancy to hope for, but with
 #   a sufficiently smart Editor it could be done
 
+### PHRASE TEMPLATES ###
+
+# A phrase like '<he-1> made <his-1> way to <2>' is compiled, once, into a
+# tuple of tokens.  Each token is either a literal string, or a triple of
+# (name of the Actor method which renders it, participant index, original
+# text of the placeholder).  The original text is kept so that a placeholder
+# which refers to a participant the event doesn't have is left as-is, which
+# is what the old str.replace-based rendering did.
+
+PLACEHOLDER = re.compile(r'<(?:(indef|his|him|he|was|is)-)?(\d+)>')
+
+RENDERERS = {
+    None: 'render',
+    'indef': 'indefinite',
+    'his': 'posessive',
+    'him': 'accusative',
+    'he': 'pronoun',
+    'was': 'was',
+    'is': 'is_',
+}
+
+# maps phrase strings to compiled templates
+_templates = {}
+
+
+def compile_phrase(phrase):
+    template = _templates.get(phrase)
+    if template is not None:
+        return template
+    tokens = []
+    pos = 0
+    for match in PLACEHOLDER.finditer(phrase):
+        if match.start() > pos:
+            tokens.append(phrase[pos:match.start()])
+        tokens.append((RENDERERS[match.group(1)], int(match.group(2)) - 1,
+                       match.group(0)))
+        pos = match.end()
+    if pos < len(phrase):
+        tokens.append(phrase[pos:])
+    template = tuple(tokens)
+    _templates[phrase] = template
+    return template
+
+
 ### EVENTS ###
 
 class Event(object):
-    def __init__(self, phrase, participants, excl=False):
+    __slots__ = ('phrase', 'participants', 'location', 'excl', 'observers',
+                 'original_location')
+
+    def __init__(self, phrase, participants, excl=False, observers=None):
         """participants[0] is always the initiator, and we
         record the location that the event was initiated in.
 
-        For now, we assume such an event can be:
-        - observed by every actor at that location
+        `observers` are the actors who perceived the event (by default,
+        the initiator.)  An event which several actors observe is still
+        only one event.
+
+        For now, we assume such an event:
         - affects only actors at that location
 
         In the future, we *may* have:
@@ -41,43 +98,99 @@ class Event(object):
         participants are to be considered active)
 
         """
-        self.phrase = phrase
+        self.phrase = intern(phrase)
         self.participants = participants
         self.location = participants[0].location
         self.excl = excl
+        if observers is None:
+            observers = (participants[0],)
+        self.observers = observers
 
     def rephrase(self, new_phrase):
         """Does not modify the event.  Returns a new copy."""
-        return Event(new_phrase, self.participants, excl=self.excl)
+        return Event(new_phrase, self.participants, excl=self.excl,
+                     observers=self.observers)
 
     def initiator(self):
         return self.participants[0]
 
+    def key(self):
+        """Returns a structural identity for this event, which is cheap
+        to compute and compare.  Two events with the same key will always
+        render to the same text, so this is what we compare instead of
+        rendering them.
+
+        (The converse does not hold: two different characters who are
+        both named 'Bob' would render the same, but have different keys.
+        This is arguably more correct.)
+
+        """
+        return (self.phrase, tuple(self.participants), self.excl)
+
+    def fingerprint(self):
+        """Returns a number which stands for how this event renders,
+        made from its phrase and its participants' names, for noticing
+        repeated sentences (see swallows.engine.repetition.)  Unlike
+        key(), it is the same from one run to the next.
+
+        """
+        return hash((self.phrase,
+                     tuple(p.name for p in self.participants),
+                     self.excl))
+
     def __str__(self):
-        phrase = self.phrase
-        i = 0
-        for participant in self.participants:
-            phrase = phrase.replace('<%d>' % (i + 1), participant.render(self.participants))
-            phrase = phrase.replace('<indef-%d>' % (i + 1), participant.indefinite())
-            phrase = phrase.replace('<his-%d>' % (i + 1), participant.posessive())
-            phrase = phrase.replace('<him-%d>' % (i + 1), participant.accusative())
-            phrase = phrase.replace('<he-%d>' % (i + 1), participant.pronoun())
-            phrase = phrase.replace('<was-%d>' % (i + 1), participant.was())
-            phrase = phrase.replace('<is-%d>' % (i + 1), participant.is_())
-            i = i + 1
+        participants = self.participants
+        parts = []
+        for token in compile_phrase(self.phrase):
+            if token.__class__ is not tuple:
+                parts.append(token)
+                continue
+            (method, index, placeholder) = token
+            if index >= len(participants):
+                parts.append(placeholder)
+            elif method == 'render':
+                parts.append(participants[index].render(participants))
+            else:
+                parts.append(getattr(participants[index], method)())
         if self.excl:
-            phrase = phrase + '!'
+            parts.append('!')
         else:
-            phrase = phrase + '.'
+            parts.append('.')
+        phrase = ''.join(parts)
         return phrase[0].upper() + phrase[1:]
 
 
+def dedup_events(events):
+    """Generator which yields the given events, except that the same
+    event will not be yielded multiple times in a row.  Works on any
+    iterable, including one whose events are still being produced.
+
+    """
+    last_key = None
+    for event in events:
+        key = event.key()
+        if key != last_key:
+            yield event
+            last_key = key
+
+
 class EventCollector(object):
-    def __init__(self):
+    def __init__(self, stats=None):
         self.events = []
+        self.stats = stats
     
     def collect(self, event):
         self.events.append(event)
+        if self.stats is not None:
+            self.stats.count_event(event)
+
+    def drain(self):
+        """Removes all of the events collected so far, and returns them.
+
+        """
+        events = self.events
+        self.events = []
+        return events
 
     def dedup(self):
         """Modifies the sequence of events so that the same event
@@ -86,11 +199,7 @@ class EventCollector(object):
         """
         if len(self.events) <= 1:
             return
-        events = [self.events[0]]
-        for event in self.events[1:]:
-            if str(event) != str(events[-1]):
-                events.append(event)
-        self.events = events
+        self.events = list(dedup_events(self.events))
         
 
 # not really needed, as emit() does nothing if there is no collector
@@ -102,8 +211,149 @@ class Oblivion(EventCollector):
 oblivion = Oblivion()
 
 
+### PEEPHOLE RULES ###
+
+# see swallows.engine.peephole.  Pronouns are put in first, since the
+# other rules are written for the phrases with the pronouns in them.
+
+pronouns = peephole.RuleSet('pronouns')
+phrasing = peephole.RuleSet('phrasing')
+
+WENT_TO = ('<1> went to <2>', '<he-1> went to <2>')
+MADE_WAY_TO = ('<1> made <his-1> way to <2>', '<he-1> made <his-1> way to <2>')
+
+# sentences which say where someone is; these are never left out as
+# repetitive (see Editor.suppress_repeats), or the reader would lose track
+SETS_THE_SCENE = frozenset(WENT_TO + MADE_WAY_TO +
+                           ('<1> <was-1> in <2>', '<he-1> <was-1> in <2>'))
+
+
+@pronouns.rule()
+def replace_proper_noun(editor, prev, event):
+    # replace repeated proper nouns with pronouns
+    if (event.participants[0] == prev.participants[0] and
+        event.phrase.startswith('<1>')):
+        event.phrase = intern('<he-1>' + event.phrase[3:])
+    return event
+
+
+@phrasing.rule(WENT_TO, '<he-1> went to <2>')
+def chain_went_to(editor, prev, event):
+    # replace chains of 'went to' with 'made way to'
+    if event.participants[0] != prev.participants[0]:
+        return event
+    assert event.location == event.participants[1]
+    assert prev.location == prev.participants[1]
+    prev.phrase = intern('<1> made <his-1> way to <2>')
+    prev.participants[1] = event.participants[1]
+    prev.location = event.participants[1]
+    # ack
+    prev.original_location = editor.location_of(prev.participants[0])
+    return None
+
+
+@phrasing.rule(MADE_WAY_TO, '<he-1> went to <2>')
+def chain_made_way_to(editor, prev, event):
+    if event.participants[0] != prev.participants[0]:
+        return event
+    assert event.location == event.participants[1]
+    assert prev.location == prev.participants[1]
+    prev.phrase = intern('<1> made <his-1> way to <2>')
+    prev.participants[1] = event.participants[1]
+    prev.location = event.participants[1]
+    # and if they 'made their way' to their current location...
+    # if editor.location_of(prev.participants[0]) == prev.original_location:
+    #     prev.phrase = '<1> wandered around for a bit, then went back to <2>'
+    return None
+
+
+@phrasing.rule(WENT_TO + MADE_WAY_TO, '<he-1> saw <2>')
+def where_they_saw(editor, prev, event):
+    # "Bob went to the shed.  He saw Alice." ->
+    # "Bob went to the shed, where he saw Alice."
+    if (event.participants[0] != prev.participants[0] or
+        event.location != prev.location):
+        return event
+    prev.phrase = intern(prev.phrase + ', where <he-1> saw <3>')
+    prev.participants = [prev.participants[0], prev.participants[1],
+                         event.participants[1]]
+    return None
+
+
+@phrasing.rule()
+def count_repeats(editor, prev, event):
+    # check for verbatim repeated.  we compare structural keys rather
+    # than rendered text, so (unlike the old string comparison) two
+    # different characters who happen to share a name are not
+    # mistaken for each other.
+    (phrase, participants, excl) = event.key()
+    last_key = prev.key()
+    if last_key == (phrase, participants, excl):
+        prev.phrase = intern(phrase + ', twice')
+    elif last_key == (phrase + ', twice', participants, excl):
+        prev.phrase = intern(phrase + ', several times')
+    elif last_key == (phrase + ', several times', participants, excl):
+        pass
+    else:
+        return event
+    return None
+
+
 ### EDITOR AND PUBLISHER ###
 
+class Timeline(object):
+    """Where, in the sequence of events an Editor has read, some of them
+    are: all the events at one location, or all the events one actor
+    initiated.  Also keeps where each of them took place, as it was when
+    read (the Editor may rewrite the events themselves.)
+
+    """
+    __slots__ = ('indexes', 'locations', 'position')
+
+    def __init__(self):
+        self.indexes = []
+        self.locations = []
+        # the Editor only ever moves forward through its events, so we
+        # remember how far it got, instead of searching from the start
+        self.position = 0
+
+    def next_from(self, start):
+        """Returns the index of the first event on this timeline which is
+        at or after `start`, or None if there are none (yet.)  `start`
+        must never be less than it was the last time.
+
+        """
+        indexes = self.indexes
+        position = self.position
+        while position < len(indexes) and indexes[position] < start:
+            position += 1
+        self.position = position
+        if position < len(indexes):
+            return indexes[position]
+        return None
+
+    def location_before(self, stop):
+        """Returns where the last event on this timeline which is before
+        `stop` took place, or None if there are none.
+
+        """
+        n = bisect_left(self.indexes, stop)
+        if n == 0:
+            return None
+        return self.locations[n - 1]
+
+    def forget_before(self, stop):
+        """Forgets the events on this timeline which are before `stop`,
+        except the last of them, which location_before still needs.
+
+        """
+        n = bisect_left(self.indexes, stop) - 1
+        if n > 0:
+            del self.indexes[:n]
+            del self.locations[:n]
+            self.position = max(0, self.position - n)
+
+
 class Editor(object):
     """The Editor is remarkably similar to the _peephole optimizer_ in
     compiler construction.  Instead of replacing sequences of instructions
@@ -120,33 +370,192 @@ class Editor(object):
     follow.  (I don't think there's a compiler construction analogy for
     that.)
 
+    The Editor reads its events from either an EventCollector, or any
+    iterable of events.  The iterable can be a generator which is still
+    running the simulation (see Publisher.stream_events), in which case
+    paragraphs are written while the actors are still living.
+
+    As it reads them, it files each event on two Timelines: that of the
+    location where it happened, and that of the actor who initiated it.
+    To write a paragraph, it only needs to look at the timeline of where
+    the character it is following is, and at that character's own
+    timeline (which says when they go somewhere else), so the events
+    nobody is following are passed over without being looked at.  And a
+    character with nothing left to see is passed over too, instead of
+    being given an empty paragraph.
+
+    Events are numbered in the order they were read, from the start of
+    the chapter, but once the cursor is well past them, the events
+    before it are let go of, so that the Editor only holds on to the
+    events it hasn't got to yet (see forget_used.)
+
+    The rewriting is done by the peephole rules above (see
+    swallows.engine.peephole); `rule_sets` are the sets of them the
+    Editor applies to each paragraph, and a subclass can use others.
+
+    If it is given a `repetition` window (see swallows.engine.repetition),
+    the Editor also leaves out sentences which have been written too
+    often lately, summing up any long run of them in one sentence.  The
+    window can be handed from one Editor to the next, so that it spans
+    chapters.
+
     """
+    rule_sets = (pronouns, phrasing)
+    # how many used events to let build up before letting go of them (on
+    # top of one for each timeline, since every timeline is trimmed then)
+    forget_after = 256
  
-    def __init__(self, collector, main_characters):
-        self.events = list(reversed(collector.events))
+    def __init__(self, events, main_characters, rng=random, stats=None,
+                 sink=None, repetition=None):
+        if isinstance(events, EventCollector):
+            events = events.events
+        self.events = iter(events)
+        # the events we have read from self.events, and not yet let go of;
+        # self.read[0] is event number self.first.  the ones before
+        # self.cursor have been written, or passed over.
+        self.read = []
+        self.first = 0
+        self.cursor = 0
+        # maps locations, and actors, to their Timelines
+        self.at_location = {}
+        self.by_actor = {}
         self.main_characters = main_characters
+        self.rng = rng
+        self.stats = stats
+        if sink is None:
+            sink = StreamSink()
+        self.sink = sink
+        self.repetition = repetition
         self.pov_index = 0
-        # maps main characters to where they last were (omniscient)
-        self.character_location = {}
         # maps main characters to where the reader last saw them
         self.last_seen_at = {}        
 
+    def read_event(self):
+        """Reads the next event, files it on its timelines, and returns
+        it.  Returns None if there are no more.
+
+        """
+        event = next(self.events, None)
+        if event is None:
+            return None
+        index = self.first + len(self.read)
+        self.read.append(event)
+        location = event.location
+        timeline = self.at_location.get(location)
+        if timeline is None:
+            timeline = self.at_location[location] = Timeline()
+        timeline.indexes.append(index)
+        timeline.locations.append(location)
+        actor = event.participants[0]
+        timeline = self.by_actor.get(actor)
+        if timeline is None:
+            timeline = self.by_actor[actor] = Timeline()
+        timeline.indexes.append(index)
+        timeline.locations.append(location)
+        return event
+
+    def location_of(self, actor):
+        """Returns where `actor` was, as of the events we have written or
+        passed over (omniscient), or None if it hasn't done anything yet.
+
+        """
+        timeline = self.by_actor.get(actor)
+        if timeline is None:
+            return None
+        return timeline.location_before(self.cursor)
+
+    def next_visible(self, pov_actor, location):
+        """Returns the index of the next event, from the cursor on, which
+        `pov_actor` would see from `location`: one which happens there, or
+        one of its own (which may take it somewhere else.)  Reads more
+        events if need be.  Returns None if there are no more.
+
+        """
+        found = None
+        for timeline in (self.at_location.get(location),
+                         self.by_actor.get(pov_actor)):
+            if timeline is None:
+                continue
+            index = timeline.next_from(self.cursor)
+            if index is not None and (found is None or index < found):
+                found = index
+        if found is not None:
+            # any event not read yet comes after this one
+            return found
+        while True:
+            event = self.read_event()
+            if event is None:
+                return None
+            if (event.location == location or
+                event.participants[0] == pov_actor):
+                return self.first + len(self.read) - 1
+
+    def forget_used(self):
+        """Lets go of the events before the cursor, and trims the
+        timelines to match, once there are enough of them to be worth it.
+
+        """
+        used = self.cursor - self.first
+        if used < (self.forget_after + len(self.at_location) +
+                   len(self.by_actor)):
+            return
+        del self.read[:used]
+        self.first = self.cursor
+        for timelines in (self.at_location, self.by_actor):
+            for timeline in timelines.itervalues():
+                timeline.forget_before(self.cursor)
+
+    def next_pov(self):
+        """Returns the next main character, in turn, who has something
+        left to see, or None if nobody has.
+
+        """
+        for n in range(len(self.main_characters)):
+            index = (self.pov_index + n) % len(self.main_characters)
+            pov_actor = self.main_characters[index]
+            if self.next_visible(pov_actor,
+                                 self.location_of(pov_actor)) is not None:
+                self.pov_index = index
+                return pov_actor
+        return None
+
     def publish(self):
-        while len(self.events) > 0:
-            pov_actor = self.main_characters[self.pov_index]
-            paragraph_events = self.generate_paragraph_events(pov_actor)
+        while True:
+            pov_actor = self.next_pov()
+            if pov_actor is None:
+                break
+            with phase(self.stats, 'paragraphs'):
+                paragraph_events = self.generate_paragraph_events(pov_actor)
+                self.forget_used()
+            if paragraph_events:
+                with phase(self.stats, 'optimize'):
+                    paragraph_events = self.optimize_paragraph_events(paragraph_events)
+            if paragraph_events and self.repetition is not None:
+                with phase(self.stats, 'repeats'):
+                    paragraph_events = self.suppress_repeats(paragraph_events)
+            # (all of it may have been left out as repetitive)
             if paragraph_events:
-                paragraph_events = self.optimize_paragraph_events(paragraph_events)
-            self.publish_paragraph(paragraph_events)
+                with phase(self.stats, 'output'):
+                    self.publish_paragraph(paragraph_events)
             self.pov_index += 1
             if self.pov_index >= len(self.main_characters):
                 self.pov_index = 0
 
     def generate_paragraph_events(self, pov_actor):
-        quota = random.randint(10, 25)
+        quota = self.rng.randint(10, 25)
         paragraph_events = []
-        while len(paragraph_events) < quota and len(self.events) > 0:
-            event = self.events.pop()
+        location = self.location_of(pov_actor)
+        while len(paragraph_events) < quota:
+            index = self.next_visible(pov_actor, location)
+            if index is None:
+                # leave whatever is left for the other characters
+                break
+            event = self.read[index - self.first]
+            # everything between here and there happened out of sight
+            self.cursor = index + 1
+            # either it happened where the character is, or the character
+            # did it, and is now wherever it happened
+            location = event.location
 
             if not paragraph_events:
                 # this is the first sentence of the paragraph
@@ -155,148 +564,383 @@ class Editor(object):
                     if not (('went to' in event.phrase) or ('made <his-1> way to' in event.phrase) or (event.phrase == '<1> <was-1> in <2>')):
                         paragraph_events.append(Event('<1> <was-1> in <2>', [pov_actor, event.location]))
 
-            # update our idea of where the character is, even if these are
-            # not events we will be dumping out
-            self.character_location[event.participants[0]] = event.location
-
-            if event.location == self.character_location[pov_actor]:
-                paragraph_events.append(event)
-                # update the reader's idea of where the character is
-                self.last_seen_at[event.participants[0]] = event.location
+            paragraph_events.append(event)
+            # update the reader's idea of where the character is
+            self.last_seen_at[event.participants[0]] = event.location
 
         return paragraph_events
 
-    def optimize_paragraph_events(self, incoming_events):
-        incoming_events = list(reversed(incoming_events))
-        events = []
-        events.append(incoming_events.pop())
-        
-        def dedup_append(event):
-            # check for verbatim repeated. this could be 'dangerous' if, say,
-            # you have two characters, Bob Jones and Bob Smith, and both are
-            # named 'Bob', and they are actually two different events... but...
-            # for now that is an edge case.
-            if str(event) == str(events[-1]):
-                events[-1].phrase = event.phrase + ', twice'
-            elif str(event.rephrase(event.phrase + ', twice')) == str(events[-1]):
-                events[-1].phrase = event.phrase + ', several times'
-            elif str(event.rephrase(event.phrase + ', several times')) == str(events[-1]):
-                pass
-            else:
-                events.append(event)
-
-        while incoming_events:
-            consume_another_event = True
-            while consume_another_event and incoming_events:
-                consume_another_event = False
-                event = incoming_events.pop()
-                last_character = events[-1].participants[0]
-                if event.participants[0] == last_character:
-                
-                    # replace repeated proper nouns with pronouns
-                    if event.phrase.startswith('<1>'):
-                        event.phrase = '<he-1>' + event.phrase[3:]
-                
-                    # replace chains of 'went to' with 'made way to'
-                    if (events[-1].phrase in ('<1> went to <2>', '<he-1> went to <2>') and
-                         event.phrase == '<he-1> went to <2>'):
-                         assert event.location == event.participants[1]
-                         assert events[-1].location == events[-1].participants[1]
-                         events[-1].phrase = '<1> made <his-1> way to <2>'
-                         events[-1].participants[1] = event.participants[1]
-                         events[-1].location = event.participants[1]
-                         # ack
-                         events[-1].original_location = self.character_location[last_character]
-                         consume_another_event = True
-                    elif (events[-1].phrase in ('<1> made <his-1> way to <2>', '<he-1> made <his-1> way to <2>') and
-                         event.phrase == '<he-1> went to <2>'):
-                         assert event.location == event.participants[1]
-                         assert events[-1].location == events[-1].participants[1]
-                         events[-1].phrase = '<1> made <his-1> way to <2>'
-                         events[-1].participants[1] = event.participants[1]
-                         events[-1].location = event.participants[1]
-                         consume_another_event = True
-                         
-                    # and if they 'made their way' to their current location...
-                    # if self.character_location[last_character] == events[-1].original_location:
-                    #     events[-1].phrase = '<1> wandered around for a bit, then went back to <2>'
-
-            dedup_append(event)
+    def optimize_paragraph_events(self, events):
+        return peephole.apply(self.rule_sets, self, events)
 
-        return events
+    def suppress_repeats(self, events):
+        """Returns the events of a paragraph with the ones which have
+        been repeated too often left out (and summed up, if there are
+        enough of them in a row.)
+
+        Events are left out a whole exchange at a time -- an exchange
+        being an event and the replies to it, and the replies to those
+        (see is_reply) -- and only if every event in it is repetitive;
+        otherwise "'Hello, Bob,' replied Alice" could be written without
+        Bob's greeting before it.
+
+        """
+        repetition = self.repetition
+        repetition.start()
+        kept = []
+        left_out = []
+        exchange = []
+        all_repeated = True
+        for event in events + [None]:
+            if exchange and (event is None or
+                             not self.is_reply(exchange[-1], event)):
+                if all_repeated:
+                    left_out.extend(exchange)
+                else:
+                    if left_out:
+                        kept.extend(self.sum_up(left_out))
+                        left_out = []
+                    kept.extend(exchange)
+                exchange = []
+                all_repeated = True
+            if event is None:
+                break
+            if not (repetition.add(event.fingerprint()) and
+                    event.phrase.split(',', 1)[0] not in SETS_THE_SCENE):
+                all_repeated = False
+            exchange.append(event)
+        if left_out:
+            kept.extend(self.sum_up(left_out))
+        return kept
+
+    def is_reply(self, prev, event):
+        """Returns True if `event` answers `prev`: that is, if it is
+        someone else's doing, and each of them is in the other's event.
+
+        """
+        actor = event.participants[0]
+        prev_actor = prev.participants[0]
+        return (actor is not prev_actor and
+                actor in prev.participants and
+                prev_actor in event.participants)
+
+    def sum_up(self, events):
+        """Returns the events to write in place of a run of repetitive
+        `events` which are being left out: none, if it's a short run, or
+        else a sentence saying that it happened.
+
+        """
+        if len(events) < 3:
+            return []
+        initiators = []
+        for event in events:
+            if event.participants[0] not in initiators:
+                initiators.append(event.participants[0])
+        if len(initiators) == 1:
+            return [Event('<1> went on like that for a while', initiators)]
+        if len(initiators) == 2:
+            return [Event('<1> and <2> went over the same ground again',
+                          initiators)]
+        return [Event('It was all much the same as before', initiators)]
 
     def publish_paragraph(self, paragraph_events):
         for event in paragraph_events:
-            sys.stdout.write(str(event) + "  ")
-            #sys.stdout.write("\n")
-        print
-        print
+            self.sink.write(str(event) + "  ")
+            #self.sink.write("\n")
+        self.sink.write("\n\n")
+        self.sink.flush()
 
 
 class Publisher(object):
     def __init__(self, characters=(), setting=(), friffery=False,
                  debug=False, title='Untitled', chapters=18,
-                 events_per_chapter=810):
+                 events_per_chapter=810, streaming=False, workers=1,
+                 seed=None, rng=None, stats=None, sink=None,
+                 collector_class=EventCollector, main_characters=None,
+                 detail_radius=None, max_repeats=None):
+        """If `streaming` is true, each chapter's events are fed to the
+        Editor as they are produced, instead of being collected in full
+        before the Editor sees any of them.  This gets the first paragraph
+        out sooner and keeps in memory only the events which the Editor
+        hasn't got to yet (and at most a few hundred it has), rather than
+        the whole chapter, but it means the debug output can't show the
+        chapter's events.
+
+        If `workers` is more than 1, chapters are simulated and edited in
+        a pool of that many processes.  Each chapter then gets its own
+        copy of the world, as it was before the first chapter, and its own
+        random seed (derived from the Publisher's); so things that happen
+        in one chapter (someone hiding the falcon in the mailbox, say) will
+        not carry over to the next one the way they do when chapters are
+        published one after another.
+
+        Every random decision made while publishing -- by the actors, and
+        by the Editor -- is made with `rng`, which is a random.Random.  If
+        it is not given, one is created from `seed`.  Giving the same seed
+        (and a world built with the same seed) produces the same novel.
+
+        If `stats` is given (a swallows.engine.stats.Stats), timings and
+        counts for each chapter are recorded in it.
+
+        The novel is written to `sink` (see swallows.engine.sinks), or to
+        standard output if no sink is given.
+
+        Each chapter's events are collected in a new `collector_class`,
+        which can be swapped for a swallows.engine.eventlog.EventLog to
+        keep them in columns instead of as a list of Event objects.
+
+        The Editor follows `main_characters` (by default, all of the
+        characters.)  If `detail_radius` is given, only characters within
+        that many moves of a main character are simulated in full; the
+        rest just drift about (see Animate.drift), which costs much less,
+        until they come close enough to matter.
+
+        If `max_repeats` is given, the Editor leaves out any pair of
+        sentences in a row which has already been written that many times
+        in the last few hundred (see swallows.engine.repetition), across
+        chapters.
+
+        """
+        # with nobody to act, there would be nothing to write about (and
+        # the Scheduler would have nobody to give a turn to)
+        if not characters:
+            raise ValueError("a Publisher needs at least one character")
         self.characters = characters
+        if main_characters is None:
+            main_characters = characters
+        self.main_characters = main_characters
+        self.detail_radius = detail_radius
+        # maps each main character to (where they were, and the distances
+        # to everywhere near there); see level_of_detail
+        self.surroundings = {}
+        self.repetition = None
+        if max_repeats is not None:
+            self.repetition = RepetitionWindow(limit=max_repeats)
         self.setting = setting
         self.friffery = friffery
         self.debug = debug
         self.title = title
         self.chapters = chapters
         self.events_per_chapter = events_per_chapter
+        self.streaming = streaming
+        self.workers = workers
+        if rng is None:
+            rng = random.Random(seed)
+        self.rng = rng
+        self.stats = stats
+        if sink is None:
+            sink = StreamSink()
+        self.sink = sink
+        self.collector_class = collector_class
+
+    def __getstate__(self):
+        # for sending a Publisher to a worker process, which will give it
+        # a sink of its own.
+        state = self.__dict__.copy()
+        state['sink'] = None
+        state['scheduler'] = None
+        return state
+
+    def stream_events(self, collector):
+        """Generator which runs the actors until the chapter has had
+        enough events, yielding those events as soon as each round of
+        turns has produced them.
 
-    def publish_chapter(self, chapter_num):
-        collector = EventCollector()
-        
+        """
+        count = 0
+        while count < self.events_per_chapter:
+            with phase(self.stats, 'simulate'):
+                self.scheduler.take_turn()
+                events = collector.drain()
+            if self.stats is not None:
+                self.stats.count_turns(1)
+            count += len(events)
+            for event in events:
+                yield event
+
+    def start_chapter(self, collector):
+        self.surroundings = {}
+        level_of_detail = None
+        if self.detail_radius is not None:
+            level_of_detail = self.level_of_detail
+        self.scheduler = Scheduler(self.characters,
+                                   level_of_detail=level_of_detail)
         for actor in self.characters:
             actor.collector = collector
-            # don't continue a conversation from the previous chapter, please
+            actor.rng = self.rng
+            actor.stats = self.stats
+            # don't continue a conversation (or anything else) from the
+            # previous chapter, please
             actor.topic = None
-            actor.place_in(pick(self.setting))
+            actor.plan = None
+            actor.place_in(pick(self.setting, self.rng))
+
+    def level_of_detail(self, actor):
+        """Returns 0 if `actor` should take its turn in full, because it
+        is a main character, or is within `detail_radius` moves of one.
+        Otherwise returns how long it can drift for, before it could
+        possibly be that close.
 
+        """
+        if actor in self.main_characters:
+            return 0
+        radius = self.detail_radius
+        # we only look this far around each main character, once each time
+        # they move, and treat anyone further away as being just beyond
+        # it.  looking further would let those actors drift for longer at
+        # a time, but the searches soon cost more than it saves.
+        horizon = radius + 3
+        nearest = horizon + 1
+        for main in self.main_characters:
+            surroundings = self.surroundings.get(main)
+            if surroundings is None or surroundings[0] is not main.location:
+                # they've moved since we last looked
+                surroundings = (main.location,
+                                navigation.within(main.location, horizon))
+                self.surroundings[main] = surroundings
+            moves = surroundings[1].get(actor.location)
+            if moves is not None and moves < nearest:
+                nearest = moves
+        if nearest <= radius:
+            return 0
+        # the gap closes by at most one move for each unit of time that
+        # passes, from each side
+        return max(1, (nearest - radius) // 2)
+
+    def simulate(self, collector):
+        """Runs the actors, in the order the scheduler says, until the
+        collector has enough events for a chapter.  Returns the number of
+        turns taken.
+
+        """
+        turns = 0
         while len(collector.events) < self.events_per_chapter:
-            for actor in self.characters:
-                actor.live()
-                #print len(collector.events) # , repr([str(e) for e in collector.events])
-
-        # this contains duplicates because we are producing duplicates in
-        # the engine because the engine assumes each actor has its own
-        # event collector which is no longer the case.
-        # This dedup'ing is temporary.
-        # Eventually, we will dedup at the source (the Actors which
-        # are currently producing redundant events.)
-        collector.dedup()
-
-        if self.debug:
-            for character in self.characters:
-                print "%s'S EVENTS:" % character.name.upper()                
-                for event in collector.events:
-                    if event.participants[0] != character:
-                        continue
-                    print "%r in %s: %s" % (
-                        [p.render([]) for p in event.participants],
-                        event.location.render([]),
-                        event.phrase
-                    )
-                print
-            for character in self.characters:
-                print "%s'S STATE:" % character.name.upper()
-                character.dump_memory()
-                print
-            print "- - - - -"
-            print
-
-        editor = Editor(collector, self.characters)
+            self.scheduler.take_turn()
+            turns += 1
+        return turns
+
+    def publish_chapter(self, chapter_num):
+        if self.stats is not None:
+            self.stats.start_chapter(chapter_num)
+        collector = self.collector_class(stats=self.stats)
+        self.start_chapter(collector)
+
+        # an event which several actors observe is emitted only once (see
+        # Actor.emit), so there are no duplicates to remove here.
+        if self.streaming:
+            events = self.stream_events(collector)
+        else:
+            with phase(self.stats, 'simulate'):
+                turns = self.simulate(collector)
+            if self.stats is not None:
+                self.stats.count_turns(turns)
+            events = collector
+
+            if self.debug:
+                for character in self.characters:
+                    self.sink.write("%s'S EVENTS:\n" % character.name.upper())
+                    for event in collector.events:
+                        if event.participants[0] != character:
+                            continue
+                        self.sink.write("%r in %s: %s\n" % (
+                            [p.render([]) for p in event.participants],
+                            event.location.render([]),
+                            event.phrase
+                        ))
+                    self.sink.write("\n")
+
+        if self.debug and not self.streaming:
+            self.dump_state()
+
+        self.edit_chapter(chapter_num, events, self.main_characters)
+
+        if self.debug and self.streaming:
+            self.dump_state()
+
+        if self.stats is not None:
+            self.stats.end_chapter()
+
+    def edit_chapter(self, chapter_num, events, main_characters):
+        """Has an Editor write the chapter from the given events (an
+        EventCollector, or any iterable of events.)  Subclasses can
+        override this to do something else with the events, as well; see
+        swallows.engine.traces.
+
+        """
+        editor = Editor(events, main_characters, rng=self.rng,
+                        stats=self.stats, sink=self.sink,
+                        repetition=self.repetition)
         editor.publish()
 
+    def dump_state(self):
+        for character in self.characters:
+            self.sink.write("%s'S STATE:\n" % character.name.upper())
+            character.dump_memory(self.sink)
+            self.sink.write("\n")
+        self.sink.write("- - - - -\n\n")
+        self.sink.flush()
+
     def publish(self):
-        print self.title
-        print "=" * len(self.title)
-        print
+        self.sink.write(self.title + "\n")
+        self.sink.write("=" * len(self.title) + "\n")
+        self.sink.write("\n")
+
+        if self.workers > 1:
+            chapters = self.publish_chapters_in_parallel()
+        else:
+            chapters = None
 
         for chapter in range(1, self.chapters+1):
-            print "Chapter %d." % chapter
-            print "-----------"
-            print
+            self.sink.write("Chapter %d.\n" % chapter)
+            self.sink.write("-----------\n")
+            self.sink.write("\n")
 
-            self.publish_chapter(chapter)
+            if chapters is None:
+                self.sink.flush()
+                self.publish_chapter(chapter)
+            else:
+                (text, record) = next(chapters)
+                self.sink.write(text)
+                self.sink.flush()
+                if record is not None:
+                    self.stats.add_chapter(record)
+
+        self.sink.flush()
+
+    def publish_chapters_in_parallel(self):
+        """Returns an iterator over the text of each chapter (and its
+        stats record, if we are keeping stats), in chapter order, while the
+        chapters are being produced in a process pool.
+
+        This Publisher is pickled, and with it the whole world (because
+        everything in the world is reachable from the characters and the
+        setting), once, here, and every task unpickles it, so every worker
+        gets a fresh copy.
+
+        """
+        base_seed = self.rng.getrandbits(32)
+        data = pickle_world(self, self.setting)
+        pool = Pool(processes=self.workers)
+        tasks = [(data, chapter, base_seed + chapter)
+                 for chapter in range(1, self.chapters+1)]
+        try:
+            for result in pool.imap(_publish_chapter_in_worker, tasks):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+# this has to be a module-level function, so that multiprocessing can
+# pickle a reference to it.
+def _publish_chapter_in_worker(task):
+    (data, chapter_num, seed) = task
+    publisher = pickle.loads(data)
+    publisher.rng = random.Random(seed)
+    publisher.sink = MemorySink()
+    publisher.publish_chapter(chapter_num)
+    text = publisher.sink.getvalue()
+    record = None
+    if publisher.stats is not None:
+        record = publisher.stats.chapters[-1]
+    return (text, record)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+import json
+from multiprocessing import Pool
+import os
+import random
+import sys
+
+from swallows.engine.events import Publisher
+from swallows.engine.sinks import open_sink
+
+# A novel farm: generates many novels, one per (seed, configuration) job,
+# into an output directory, using a pool of worker processes.
+#
+# The jobs are recorded in a manifest in the output directory before any
+# of them are run.  A novel is written to a temporary file and renamed
+# into place only when it is complete, and then marked as done in the
+# manifest.  Running the farm again on the same directory picks up the
+# manifest and does only the jobs which aren't done yet.  (A job whose
+# novel exists but which isn't marked done, because the run was killed
+# in between, counts as done too.)  The manifest also records whether the
+# novels are compressed, and a farm which would compress them differently
+# refuses to resume it, rather than writing them all again under other
+# names.
+
+MANIFEST = 'manifest.json'
+
+
+def job_name(seed, config):
+    name = 'seed-%d' % seed
+    for key in sorted(config):
+        name += '-%s-%s' % (key.replace('_', '-'), config[key])
+    return name
+
+
+class Farm(object):
+    def __init__(self, output_dir, world_factory, title='Untitled',
+                 workers=1, compress=False, world_keys=()):
+        """`world_factory` is called with rng= to build a fresh world for
+        each novel; it must be a module-level function (like
+        swallows.story.world.build_world) so that it can be sent to the
+        worker processes.  `world_keys` are the names of config keys (see
+        plan) which are passed to `world_factory`, rather than to the
+        Publisher; they are part of the job's name like the rest of its
+        config, so novels of worlds of different sizes don't collide.
+
+        If `compress` is true, novels are written gzip-compressed.
+
+        """
+        self.output_dir = output_dir
+        self.world_factory = world_factory
+        self.title = title
+        self.workers = workers
+        self.world_keys = tuple(world_keys)
+        self.extension = '.markdown'
+        if compress:
+            self.extension += '.gz'
+        self.jobs = None
+
+    def manifest_path(self):
+        return os.path.join(self.output_dir, MANIFEST)
+
+    def novel_path(self, job):
+        return os.path.join(self.output_dir, job['name'] + self.extension)
+
+    def plan(self, seeds, configs):
+        """Sets up the jobs: one novel for each seed with each config,
+        where a config is a dict of keyword arguments for the Publisher
+        (except that a number `main_cast` stands for main_characters: that
+        many of the world's characters, from the first.)
+        If the output directory already has a manifest, that manifest is
+        resumed, and whichever of these jobs it doesn't have yet are added
+        to it (the jobs it has are kept, whether they were asked for again
+        or not.)  Returns True if an existing manifest was resumed.
+
+        """
+        jobs = []
+        for config in configs:
+            for seed in seeds:
+                jobs.append({
+                    'name': job_name(seed, config),
+                    'seed': seed,
+                    'config': config,
+                })
+        if os.path.exists(self.manifest_path()):
+            with open(self.manifest_path()) as f:
+                manifest = json.load(f)
+            extension = manifest.get('extension', '.markdown')
+            if extension != self.extension:
+                raise ValueError("the novels in %s are %s files, not %s" %
+                                 (self.output_dir, extension, self.extension))
+            self.jobs = manifest['jobs']
+            names = set(job['name'] for job in self.jobs)
+            self.jobs.extend(job for job in jobs if job['name'] not in names)
+            self.save_manifest()
+            return True
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir)
+        self.jobs = jobs
+        self.save_manifest()
+        return False
+
+    def save_manifest(self):
+        for job in self.jobs:
+            job['done'] = (job.get('done', False) or
+                           os.path.exists(self.novel_path(job)))
+        temp_path = self.manifest_path() + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'title': self.title, 'extension': self.extension,
+                       'jobs': self.jobs}, f, indent=1)
+        os.rename(temp_path, self.manifest_path())
+
+    def pending_jobs(self):
+        return [job for job in self.jobs if not job['done']]
+
+    def run(self, log=sys.stderr):
+        pending = self.pending_jobs()
+        done = len(self.jobs) - len(pending)
+        by_name = dict((job['name'], job) for job in pending)
+        tasks = [(self.world_factory, self.world_keys, self.title,
+                  self.novel_path(job), job)
+                 for job in pending]
+        if self.workers > 1:
+            pool = Pool(processes=self.workers)
+            results = pool.imap_unordered(_run_job, tasks)
+        else:
+            pool = None
+            results = (_run_job(task) for task in tasks)
+        try:
+            for name in results:
+                by_name[name]['done'] = True
+                done += 1
+                log.write("%s done (%d of %d)\n" % (name, done, len(self.jobs)))
+                self.save_manifest()
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+
+# this has to be a module-level function, so that multiprocessing can
+# pickle a reference to it.
+def _run_job(task):
+    (world_factory, world_keys, title, path, job) = task
+    rng = random.Random(job['seed'])
+    config = dict((str(key), value) for (key, value) in job['config'].iteritems())
+    world_args = dict((key, config.pop(key)) for key in world_keys
+                      if key in config)
+    world = world_factory(rng=rng, **world_args)
+    main_cast = config.pop('main_cast', None)
+    if main_cast is not None:
+        config['main_characters'] = world.characters[:main_cast]
+    # the temporary file keeps the real one's extension, so open_sink
+    # knows whether to compress it
+    (base, name) = os.path.split(path)
+    temp_path = os.path.join(base, '.tmp-' + name)
+    sink = open_sink(temp_path)
+    publisher = Publisher(
+        characters=world.characters,
+        setting=world.setting,
+        title=title,
+        rng=rng,
+        sink=sink,
+        **config
+    )
+    try:
+        publisher.publish()
+    finally:
+        sink.close()
+    os.rename(temp_path, path)
+    return job['name']
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+from collections import deque
+
+# Navigation: finding the shortest way from one location to another, by
+# following exits.
+#
+# The first time a way is asked for from some location, a breadth-first
+# search from there finds, for every location which can be reached from
+# it, which exit to take first to get there in the fewest moves, and how
+# many moves that is.  That row is kept on the location (in `routes`), so
+# every later question about getting anywhere from there is a lookup in a
+# dict, not a search.  Rows are only built for locations someone actually
+# asks about, so a big map doesn't pay for all of its pairs up front.
+#
+# Every location which a row reaches notes the row's source (in
+# `routed_via`), so that when a location's exits are changed (see
+# Location.set_exits), only the rows which went through that location are
+# thrown away -- the others can't have been affected.  Those are built
+# again the next time they are needed.
+#
+# A row covers the whole map, so it is only worth building for a location
+# that will be asked about again and again.  To find out just what is
+# nearby, use within(), which searches no further than it is asked to and
+# keeps nothing.
+
+
+def routes_from(source):
+    """Returns the row of routes from `source`: a dict mapping each
+    location reachable from it to a pair of (the exit to take first,
+    the number of moves it takes.)  `source` maps to (None, 0).
+
+    """
+    routes = source.routes
+    if routes is not None:
+        return routes
+    routes = {source: (None, 0)}
+    queue = deque([source])
+    while queue:
+        here = queue.popleft()
+        (first_exit, moves) = routes[here]
+        for exit in here.exits:
+            if exit not in routes:
+                routes[exit] = (first_exit or exit, moves + 1)
+                queue.append(exit)
+    for location in routes:
+        location.routed_via.add(source)
+    source.routes = routes
+    return routes
+
+
+def next_hop(source, target):
+    """Returns the exit from `source` which is the first step on a
+    shortest way to `target`, or None if there is no way there (or
+    `source` is `target`.)
+
+    """
+    route = routes_from(source).get(target)
+    if route is None:
+        return None
+    return route[0]
+
+
+def distance(source, target):
+    """Returns the fewest moves it takes to get from `source` to
+    `target`, or None if there is no way there.
+
+    """
+    route = routes_from(source).get(target)
+    if route is None:
+        return None
+    return route[1]
+
+
+def within(source, moves):
+    """Returns a dict mapping each location which can be reached from
+    `source` in at most `moves` moves to the fewest moves it takes.
+
+    """
+    distances = {source: 0}
+    frontier = [source]
+    for n in xrange(1, moves + 1):
+        next_frontier = []
+        for here in frontier:
+            for exit in here.exits:
+                if exit not in distances:
+                    distances[exit] = n
+                    next_frontier.append(exit)
+        frontier = next_frontier
+    return distances
+
+
+def invalidate(location):
+    """Throws away every row of routes which went through `location`;
+    call this when its exits change.
+
+    """
+    for source in location.routed_via:
+        source.routes = None
+    location.routed_via = set()
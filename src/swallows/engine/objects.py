@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 
+from collections import OrderedDict
+from functools import wraps
 import random
 import sys
 
 from swallows.engine.events import Event
-from swallows.util import pick
+from swallows.engine import navigation
+from swallows.util import pick, OrderedSet
 
 ### TOPICS ###
 
@@ -13,44 +16,252 @@ from swallows.util import pick
 # (for example, a gesture.)
 
 class Topic(object):
+    __slots__ = ('originator', 'subject')
+
     def __init__(self, originator, subject=None):
         self.originator = originator
         self.subject = subject
 
 
 class GreetTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class SpeechTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class QuestionTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 ### MEMORIES ###
 
 class Memory(object):
+    __slots__ = ('subject', 'location', 'i_hid_it_there')
+
     def __init__(self, subject, location, i_hid_it_there=False):
         self.subject = subject  # the thing being remembered
         self.location = location  # where we last remember seeing it
         self.i_hid_it_there = i_hid_it_there
 
 
+class MemoryStore(object):
+    """All of an animate's memories.  They are indexed both by the thing
+    remembered and by where it is remembered to be, so that "where did I
+    last see the falcon?" and "what do I remember being in the liquor
+    cabinet?" are both just lookups, no matter how much is remembered.
+
+    Otherwise it acts like a dict mapping things to Memory objects.
+
+    """
+    __slots__ = ('by_subject', 'by_location')
+
+    def __init__(self):
+        self.by_subject = OrderedDict()
+        # maps locations to OrderedDicts mapping things to Memory objects.
+        # a memory which is replaced is taken out of its old location's
+        # dict first, so each dict is always in the order its memories
+        # were added, oldest first, and at() can just return them.
+        self.by_location = {}
+
+    def add(self, memory):
+        subject = memory.subject
+        old_memory = self.by_subject.get(subject)
+        if old_memory is not None:
+            self.unindex(old_memory)
+        self.by_subject[subject] = memory
+        here = self.by_location.get(memory.location)
+        if here is None:
+            here = OrderedDict()
+            self.by_location[memory.location] = here
+        here[subject] = memory
+
+    def unindex(self, memory):
+        here = self.by_location[memory.location]
+        del here[memory.subject]
+        if not here:
+            del self.by_location[memory.location]
+
+    def at(self, location):
+        """Returns a list of the memories of things being in `location`,
+        oldest first.
+
+        """
+        here = self.by_location.get(location)
+        if here is None:
+            return []
+        return here.values()
+
+    def get(self, thing, default=None):
+        return self.by_subject.get(thing, default)
+
+    def __getitem__(self, thing):
+        return self.by_subject[thing]
+
+    def __delitem__(self, thing):
+        self.unindex(self.by_subject.pop(thing))
+
+    def __contains__(self, thing):
+        return thing in self.by_subject
+
+    def __iter__(self):
+        return iter(self.by_subject)
+
+    def __len__(self):
+        return len(self.by_subject)
+
+
+### ACTIONS ###
+
+def action(method=None, duration=1):
+    """Decorator for methods of Animates which are actions that they take,
+    so that each time one is taken it can be counted in the Publisher's
+    Stats (if it is keeping any.)
+
+    It also records how long the action takes, for the Scheduler (see
+    swallows.engine.scheduler); use it as @action(duration=N) for an
+    action which takes longer than 1.
+
+    """
+    if method is None:
+        return lambda method: action(method, duration=duration)
+    name = method.__name__
+
+    @wraps(method)
+    def counted(self, *args, **kwargs):
+        if self.stats is not None:
+            self.stats.count_action(self, name)
+        if duration > self.busy:
+            self.busy = duration
+        return method(self, *args, **kwargs)
+
+    return counted
+
+
+### CONTENTS ###
+
+class Contents(OrderedSet):
+    """The set of things in an actor (usually a location.)
+
+    As well as the set of everything in it, it keeps lists of the things
+    in it which are animate, notable, containers, and takeable, so that
+    "who is here to see this?" and "what could I hide something in?" don't
+    mean looking at everything in the room.  The lists are in the same
+    order as the set, and are kept up to date as things are added and
+    removed (which happens in move_to and place_in.)
+
+    Don't add or remove things while iterating over one of the lists.
+
+    """
+    def __init__(self):
+        OrderedSet.__init__(self)
+        self.animates = []
+        self.notables = []
+        self.containers = []
+        self.takeables = []
+
+    def add(self, thing):
+        if thing in self:
+            return
+        OrderedSet.add(self, thing)
+        flags = thing.flags
+        if flags & ANIMATE:
+            self.animates.append(thing)
+        if flags & NOTABLE:
+            self.notables.append(thing)
+        if flags & CONTAINER:
+            self.containers.append(thing)
+        if flags & TAKEABLE:
+            self.takeables.append(thing)
+
+    def remove(self, thing):
+        OrderedSet.remove(self, thing)
+        flags = thing.flags
+        if flags & ANIMATE:
+            self.animates.remove(thing)
+        if flags & NOTABLE:
+            self.notables.remove(thing)
+        if flags & CONTAINER:
+            self.containers.remove(thing)
+        if flags & TAKEABLE:
+            self.takeables.remove(thing)
+
+    def discard(self, thing):
+        if thing in self:
+            self.remove(thing)
+
+
 ### ACTORS (objects in the world) ###
 
+# What kind of thing an actor is, is decided by overriding the methods
+# treasure(), weapon() etc. in subclasses (and mixins.)  But since those
+# answers never change, each actor works them out once, when it is
+# constructed, and keeps them in `flags` as a set of these bits, so that
+# a check like "is this notable?" is just `x.flags & NOTABLE`.
+
+TREASURE = 1
+WEAPON = 2
+HORROR = 4
+TAKEABLE = 8
+ANIMATE = 16
+CONTAINER = 32
+NOTABLE = 64
+
+# maps classes of actor to their flags
+_class_flags = {}
+
+
 class Actor(object):
+    __slots__ = ('name', 'collector', 'contents', 'enter', 'location',
+                 'flags')
+
     def __init__(self, name, location=None, collector=None):
         self.name = name
         self.collector = collector
-        self.contents = set()
+        self.contents = Contents()
         self.enter = ""
         self.location = None
+        self.flags = self.classify()
         if location is not None:
             self.move_to(location)
 
+    def classify(self):
+        flags = _class_flags.get(self.__class__)
+        if flags is None:
+            flags = 0
+            if self.treasure():
+                flags |= TREASURE
+            if self.weapon():
+                flags |= WEAPON
+            if self.horror():
+                flags |= HORROR
+            if self.takeable():
+                flags |= TAKEABLE
+            if self.animate():
+                flags |= ANIMATE
+            if self.container():
+                flags |= CONTAINER
+            if self.notable():
+                flags |= NOTABLE
+            _class_flags[self.__class__] = flags
+        return flags
+
+    def _slot_state(self, **overrides):
+        """Returns the state of this actor for pickling, in the form
+        which __getstate__ returns for a class with __slots__, but with
+        the given slots replaced by the given values.  For subclasses
+        which have something in their slots that shouldn't be pickled.
+
+        """
+        slots = {}
+        for cls in self.__class__.__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if hasattr(self, name):
+                    slots[name] = getattr(self, name)
+        slots.update(overrides)
+        return (getattr(self, '__dict__', None), slots)
+
     def notable(self):
         return self.treasure() or self.weapon() or self.animate() or self.horror()
 
@@ -90,9 +301,26 @@ class Actor(object):
     def is_(self):
         return "is"
 
-    def emit(self, *args, **kwargs):
-        if self.collector:
-            self.collector.collect(Event(*args, **kwargs))
+    def emit(self, phrase, participants, excl=False, observers=None,
+             memory=None):
+        """Emits an event, which is observed by `observers` (by default,
+        only this actor.)  However many actors observe it, it is emitted
+        only once.
+
+        If `memory` is given, it is a pair of (thing, location), and each
+        observer remembers the thing as being at the location.
+
+        """
+        if observers is None:
+            observers = (self,)
+        if memory is not None:
+            (thing, location) = memory
+            for observer in observers:
+                observer.remember(thing, location)
+        if self.collector is not None:
+            self.collector.collect(
+                Event(phrase, participants, excl=excl, observers=observers)
+            )
 
     def move_to(self, location):
         if self.location:
@@ -118,27 +346,31 @@ class Actor(object):
         return '%s %s' % (article, self.name)
 
     # for debugging
-    def dump_memory(self):
+    def dump_memory(self, out=sys.stdout):
         for thing in self.memories:
             memory = self.memories[thing]
-            print ".oO{ %s is in %s }" % (
+            out.write(".oO{ %s is in %s }\n" % (
                 memory.subject.render([]),
-                memory.location.render([]))
+                memory.location.render([])))
             if memory.i_hid_it_there:
-                print ".oO{ I hid it there }"
-        print "desired items:", repr(self.desired_items)
-        print "decisions:", repr(self.what_to_do_about)
-        print "knowledge of others' decisions:", repr(self.other_decision_about)
+                out.write(".oO{ I hid it there }\n")
+        out.write("desired items: %r\n" % (self.desired_items,))
+        out.write("decisions: %r\n" % (self.what_to_do_about,))
+        out.write("knowledge of others' decisions: %r\n" % (self.other_decision_about,))
 
 
 ### some mixins for Actors ###
 
 class ProperMixin(object):
+    __slots__ = ()
+
     def article(self):
         return ''
 
 
 class PluralMixin(object):
+    __slots__ = ()
+
     def posessive(self):
         return "their"
 
@@ -160,6 +392,8 @@ class PluralMixin(object):
 
 
 class MasculineMixin(object):
+    __slots__ = ()
+
     def posessive(self):
         return "his"
 
@@ -171,6 +405,8 @@ class MasculineMixin(object):
 
 
 class FeminineMixin(object):
+    __slots__ = ()
+
     def posessive(self):
         return "her"
 
@@ -184,12 +420,30 @@ class FeminineMixin(object):
 ### ANIMATE OBJECTS ###
 
 class Animate(Actor):
+    __slots__ = ('topic', 'rng', 'stats', 'memories', 'desired_items',
+                 'nerves', 'what_to_do_about', 'other_decision_about',
+                 'scheduler', 'asleep', 'turn', 'busy', 'plan')
+
     def __init__(self, name, location=None, collector=None):
         Actor.__init__(self, name, location=location, collector=None)
         self.topic = None
-        # hash of actor object to Memory object
-        self.memories = {}
-        self.desired_items = set()
+        # source of all of this actor's random decisions; the Publisher
+        # replaces this with its own seeded random.Random
+        self.rng = random.Random()
+        # where to count the actions we take; set by the Publisher
+        self.stats = None
+        # what decides when we take our turns, set by the Publisher, and
+        # our place in it (see swallows.engine.scheduler)
+        self.scheduler = None
+        self.asleep = False
+        self.turn = None
+        # how long the actions of our current turn will take
+        self.busy = 0
+        # the generator from behave() which we are part way through
+        self.plan = None
+        # maps actor objects to Memory objects
+        self.memories = MemoryStore()
+        self.desired_items = OrderedSet()
         # this should really be *derived* from having a recent memory
         # of seeing a dead body in the bathroom.  but for now,
         self.nerves = 'calm'
@@ -200,25 +454,58 @@ class Animate(Actor):
         self.what_to_do_about = {}
         self.other_decision_about = {}
 
+    def __getstate__(self):
+        # a plan is a running generator, which can't be pickled; it will
+        # start again from the top after unpickling.
+        return self._slot_state(plan=None)
+
     def animate(self):
         return True
 
     def remember(self, thing, location, i_hid_it_there=False):
         assert isinstance(thing, Actor)
-        self.memories[thing] = Memory(thing, location, i_hid_it_there=i_hid_it_there)
+        self.memories.add(Memory(thing, location, i_hid_it_there=i_hid_it_there))
     
     def recall(self, thing):
         assert isinstance(thing, Actor)
         return self.memories.get(thing, None)
 
+    def sleep(self, duration=None):
+        """Stops taking turns until someone comes into the room or
+        addresses us, or (if `duration` is given) until that much time
+        has passed.
+
+        """
+        if self.scheduler is not None:
+            self.scheduler.sleep(self, duration)
+
+    def wake(self):
+        if self.scheduler is not None:
+            self.scheduler.wake(self)
+
+    def interrupt(self):
+        if self.scheduler is not None:
+            self.scheduler.interrupt(self)
+
+    def wake_others_here(self):
+        for x in self.location.contents.animates:
+            if x is not self:
+                x.wake()
+
+    def onlookers(self):
+        """Returns the other animates in the same location as this one,
+        in the order they came into it.
+
+        """
+        return [x for x in self.location.contents.animates if x is not self]
+
+    @action
     def address(self, other, topic, phrase, participants=None):
         if participants is None:
             participants = [self, other]
         other.topic = topic
-        # in the absence of a better event-collection system
-        # we do this sort of thing when >1 actor can observe an event:
-        self.emit(phrase, participants)
-        other.emit(phrase, participants)
+        other.interrupt()
+        self.emit(phrase, participants, observers=(self, other))
 
     def greet(self, other, phrase, participants=None):
         self.address(other, GreetTopic(self), phrase, participants)
@@ -229,36 +516,39 @@ class Animate(Actor):
     def question(self, other, phrase, participants=None, subject=None):
         self.address(other, QuestionTopic(self, subject=subject), phrase, participants)
 
+    @action
     def place_in(self, location):
         # like move_to but quieter; for setting up scenes etc
         if self.location is not None:
             self.location.contents.remove(self)
         self.location = location
         self.location.contents.add(self)
+        self.wake_others_here()
         self.emit("<1> <was-1> in <2>", [self, self.location])
-        for x in self.location.contents:
+        for x in self.location.contents.notables:
             if x == self:
                 continue
-            if x.notable():
-                self.emit("<1> saw <2>", [self, x])
-                self.remember(x, self.location)
+            self.emit("<1> saw <2>", [self, x])
+            self.remember(x, self.location)
 
+    @action
     def move_to(self, location):
         assert(location != self.location)
         assert(location is not None)
-        for x in self.location.contents:
+        for x in self.location.contents.animates:
             # otherwise we get "Bob saw Bob leave the room", eh?
             if x is self:
                 continue
-            if x.animate():
-                x.emit("<1> saw <2> leave the %s" % x.location.noun(), [x, self])
+            x.emit("<1> saw <2> leave the %s" % x.location.noun(), [x, self])
         if self.location is not None:
             self.location.contents.remove(self)
         self.location = location
         assert self not in self.location.contents
         self.location.contents.add(self)
+        self.wake_others_here()
         self.emit("<1> went to <2>", [self, self.location])
 
+    @action
     def point_at(self, other, item):
         # it would be nice if there was some way to
         # indicate the revolver as part of the Topic which will follow,
@@ -267,53 +557,99 @@ class Animate(Actor):
         assert self.location == other.location
         assert item.location == self
         self.emit("<1> pointed <3> at <2>",
-            [self, other, item])
-        other.emit("<1> pointed <3> at <2>",
-            [self, other, item])
+            [self, other, item], observers=(self, other))
         other.remember(item, self)
 
+    @action
     def put_down(self, item):
         assert(item.location == self)
-        self.emit("<1> put down <2>", [self, item])
         item.move_to(self.location)
-        self.remember(item, self.location)
-        for other in self.location.contents:
-            if other is self:
-                continue
-            if other.animate():
-                other.emit("<1> put down <2>", [self, item])
-                other.remember(item, self.location)
+        self.emit("<1> put down <2>", [self, item],
+                  observers=[self] + self.onlookers(),
+                  memory=(item, self.location))
 
+    @action
     def pick_up(self, item):
         assert(item.location == self.location)
-        self.emit("<1> picked up <2>", [self, item])
         item.move_to(self)
-        self.remember(item, self)
-        for other in self.location.contents:
-            if other is self:
-                continue
-            if other.animate():
-                other.emit("<1> picked up <2>", [self, item])
-                other.remember(item, self)
+        self.emit("<1> picked up <2>", [self, item],
+                  observers=[self] + self.onlookers(),
+                  memory=(item, self))
 
+    @action
     def give_to(self, other, item):
         assert(item.location == self)
         assert(self.location == other.location)
-        self.emit("<1> gave <3> to <2>", [self, other, item])
-        other.emit("<1> gave <3> to <2>", [self, other, item])
         item.move_to(other)
-        self.remember(item, other)
-        other.remember(item, other)
+        self.emit("<1> gave <3> to <2>", [self, other, item],
+                  observers=(self, other), memory=(item, other))
+
+    @action
+    def head_towards(self, location):
+        """Takes the first step on the quickest way to `location`.  Returns
+        False (and doesn't move) if there's no way there, or we're there.
+
+        """
+        exit = self.location.next_hop(location)
+        if exit is None:
+            return False
+        self.move_to(exit)
+        return True
 
+    @action
     def wander(self):
         self.move_to(
             self.location.exits[
-                random.randint(0, len(self.location.exits)-1)
+                self.rng.randint(0, len(self.location.exits)-1)
             ]
         )
 
+    def drift(self):
+        """This gets called instead of step() when the animate is far from
+        where anything is being written about (see Publisher.detail_radius.)
+        It wanders off through a random exit -- taking whatever it is
+        carrying with it, as always -- without emitting any events,
+        remembering anything, or waking anyone.  Whatever it was doing or
+        talking about is forgotten.
+
+        """
+        self.topic = None
+        self.plan = None
+        exits = self.location.exits
+        if exits:
+            self.location.contents.remove(self)
+            self.location = exits[self.rng.randint(0, len(exits) - 1)]
+            self.location.contents.add(self)
+
+    def step(self):
+        """This gets called on each turn an animate moves.  It runs the
+        animate's plan (see behave) up to its next yield.
+
+        """
+        if self.plan is None:
+            self.plan = self.behave()
+        try:
+            next(self.plan)
+        except StopIteration:
+            self.plan = None
+
+    def behave(self):
+        """A generator which takes this animate's turns: the code between
+        one yield and the next is one turn.  Because it keeps its place
+        between turns, a plan which takes several turns (walk to a room,
+        search it, come back) can be written as straight-line code, and
+        doesn't need to be worked out again on every turn.
+
+        By default, every turn is a call to live().
+
+        """
+        while True:
+            self.live()
+            yield
+
     def live(self):
-        """This gets called on each turn an animate moves.
+        """This gets called on each turn an animate moves (unless it
+        overrides behave.)
         
         You need to implement this for particular animates.
         
@@ -324,22 +660,33 @@ class Animate(Actor):
 
 
 class Male(MasculineMixin, ProperMixin, Animate):
-    pass
+    __slots__ = ()
 
 
 class Female(FeminineMixin, ProperMixin, Animate):
-    pass
+    __slots__ = ()
 
 
 ### LOCATIONS ###
 
 class Location(Actor):
+    __slots__ = ('exits', 'noun_', 'routes', 'routed_via')
+
     def __init__(self, name, enter="went to", noun="room"):
         self.name = name
         self.enter = enter
-        self.contents = set()
+        self.contents = Contents()
         self.exits = []
         self.noun_ = noun
+        self.flags = self.classify()
+        # see swallows.engine.navigation
+        self.routes = None
+        self.routed_via = set()
+
+    def __getstate__(self):
+        # the routes are only a cache, and would drag every other location
+        # into the pickle with them; they are built again when needed.
+        return self._slot_state(routes=None, routed_via=set())
 
     def noun(self):
         return self.noun_
@@ -348,42 +695,85 @@ class Location(Actor):
         for exit in exits:
             assert isinstance(exit, Location)
         self.exits = exits
+        navigation.invalidate(self)
+
+    def next_hop(self, location):
+        """Returns the exit to take to get to `location` the quickest way,
+        or None if there's no way there from here.
+
+        """
+        return navigation.next_hop(self, location)
+
+    def distance_to(self, location):
+        return navigation.distance(self, location)
 
 
 class ProperLocation(ProperMixin, Location):
-    pass
+    __slots__ = ()
 
 
 ### OTHER INANIMATE OBJECTS ###
 
 class Item(Actor):
+    __slots__ = ()
+
     def takeable(self):
         return True
 
 
 class Weapon(Item):
+    __slots__ = ()
+
     def weapon(self):
         return True
 
 
 class Container(Actor):
+    __slots__ = ()
+
     def container(self):
         return True
 
 
 class ProperContainer(ProperMixin, Container):
-    pass
+    __slots__ = ()
 
 
 class Treasure(Item):
+    __slots__ = ()
+
     def treasure(self):
         return True
 
 
 class PluralTreasure(PluralMixin, Treasure):
-    pass
+    __slots__ = ()
 
 
 class Horror(Actor):
+    __slots__ = ()
+
     def horror(self):
         return True
+
+
+### WORLDS ###
+
+class World(object):
+    """Everything a story takes place in: the locations, the things in
+    them, and the characters.
+
+    `setting` is the locations characters may find themselves in at the
+    start of a chapter, and `characters` are the ones who live in it.
+    Any other keyword arguments are kept as attributes, so that the
+    important things in a particular world (its revolver, say) can be
+    got at by name, e.g. to extend the world or to make a new character
+    who knows about them.
+
+    """
+    def __init__(self, setting=(), characters=(), items=(), **things):
+        self.setting = tuple(setting)
+        self.characters = tuple(characters)
+        self.items = tuple(items)
+        for (name, thing) in things.iteritems():
+            setattr(self, name, thing)
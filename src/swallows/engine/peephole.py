@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+# The Editor's peephole rules.
+#
+# A rule looks at two events next to each other in a paragraph -- the one
+# already written (`prev`) and the one after it (`event`) -- and can
+# rewrite either of them, or fold `event` into `prev` so that it is not
+# written at all.  Which rules to try is decided by the two events'
+# phrases: a rule is given when it is made the phrase each event must have,
+# or None for any phrase.
+#
+# Rules are grouped into RuleSets, and apply() makes one pass over the
+# paragraph, from start to finish, putting each event through every set in
+# turn.  For each pair of phrases it meets, a set works out once which of
+# its rules apply to that pair, and remembers that in a table; so each
+# event costs one lookup in each set's table, however many rules there are.
+#
+# Why more than one set, then?  Because a rule may change an event's phrase
+# (turning '<1> went to <2>' into '<he-1> went to <2>', say), and so change
+# which rules apply to it; the table of the next set is looked up with the
+# new phrase.  Rules which only care about phrases as they are when the
+# event arrives can all go in one set.
+
+
+class RuleSet(object):
+    """A set of rules which are tried on each event in the order they
+    were added (with the `rule` decorator.)
+
+    """
+    def __init__(self, name):
+        self.name = name
+        self.rules = []
+        # maps (prev phrase, event phrase) to the rules which apply
+        self.table = {}
+
+    def rule(self, first=None, second=None):
+        """Decorator which adds a function as a rule of this set, to be
+        tried when an event whose phrase is `first` is followed by one
+        whose phrase is `second` (None matches any phrase.)  `first` and
+        `second` may also be tuples of phrases, any of which match.
+
+        The function is called with (editor, prev, event), and returns
+        the event to write after `prev` (usually `event`, which it may
+        have rewritten), or None if it has folded `event` into `prev`.
+        If it returns an event, the next rule which applies is tried on
+        it.
+
+        """
+        def register(fn):
+            self.rules.append((as_phrases(first), as_phrases(second), fn))
+            self.table = {}
+            return fn
+        return register
+
+    def rules_for(self, first, second):
+        key = (first, second)
+        rules = self.table.get(key)
+        if rules is None:
+            rules = tuple(
+                fn for (firsts, seconds, fn) in self.rules
+                if (firsts is None or first in firsts) and
+                   (seconds is None or second in seconds)
+            )
+            self.table[key] = rules
+        return rules
+
+
+def apply(rule_sets, editor, events):
+    """Returns a new list of the events of a paragraph, with the rules of
+    the given RuleSets applied to them, in one pass.
+
+    """
+    if not events:
+        return []
+    written = [events[0]]
+    for event in events[1:]:
+        prev = written[-1]
+        for rule_set in rule_sets:
+            rules = rule_set.table.get((prev.phrase, event.phrase))
+            if rules is None:
+                rules = rule_set.rules_for(prev.phrase, event.phrase)
+            for fn in rules:
+                event = fn(editor, prev, event)
+                if event is None:
+                    break
+            if event is None:
+                break
+        if event is not None:
+            written.append(event)
+    return written
+
+
+def as_phrases(phrases):
+    if phrases is None or isinstance(phrases, frozenset):
+        return phrases
+    if isinstance(phrases, basestring):
+        phrases = (phrases,)
+    return frozenset(intern(phrase) for phrase in phrases)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+from collections import deque
+
+# Noticing when the novel is repeating itself.
+#
+# 'Hello, Alice,' said Bob.  'Hello, Bob,' replied Alice.  It never gets old,
+# but by the fortieth time, the reader might disagree.  A RepetitionWindow
+# remembers the runs of `n` sentences in a row (n-grams of sentences) which
+# were written recently, and how many times each was, so the Editor can
+# leave out the ones which have been written too often lately.
+#
+# Each sentence is reduced to a number, its fingerprint (see
+# Event.fingerprint), and each n-gram to a polynomial hash of its
+# sentences' fingerprints,
+#
+#   f[0] * BASE**(n-1) + f[1] * BASE**(n-2) + ... + f[n-1]   (mod MODULUS)
+#
+# which can be rolled along from one n-gram to the next -- take the oldest
+# sentence's term away, multiply by BASE, add the newest sentence -- so a
+# sentence costs the same however long n is.  The last `window` n-gram
+# hashes are kept in a deque, with a count of each in a dict; as each new
+# one comes in, the oldest goes out, and its count goes down.  So no
+# sentence is ever compared with another as text.
+#
+# (Two different n-grams can have the same hash, in which case the second
+# is taken for a repeat of the first.  With a modulus this big, that's
+# rare enough not to matter in a novel.)
+#
+# The window is kept from one paragraph, and one chapter, to the next, but
+# an n-gram doesn't reach back past the start of a paragraph.
+
+MODULUS = 2 ** 61 - 1
+BASE = 1000003
+
+
+class RepetitionWindow(object):
+    def __init__(self, limit=2, n=2, window=400):
+        """An n-gram which is already in the window `limit` times counts
+        as repeated too often.
+
+        """
+        self.limit = limit
+        self.n = n
+        self.window = window
+        # what the first sentence of an n-gram contributes to its hash
+        self.high = pow(BASE, n - 1, MODULUS)
+        # hashes of the last `window` n-grams, oldest first
+        self.recent = deque()
+        # maps each hash in `recent` to how many times it is in there
+        self.counts = {}
+        self.start()
+
+    def start(self):
+        """Starts a new paragraph."""
+        self.fingerprints = deque()
+        self.hash = 0
+
+    def add(self, fingerprint):
+        """Adds the fingerprint of the next sentence, and returns True if
+        the n-gram which it ends has been repeated too often (see above.)
+
+        """
+        fingerprint %= MODULUS
+        fingerprints = self.fingerprints
+        hash_ = self.hash
+        if len(fingerprints) == self.n:
+            hash_ -= fingerprints.popleft() * self.high
+        hash_ = (hash_ * BASE + fingerprint) % MODULUS
+        fingerprints.append(fingerprint)
+        self.hash = hash_
+        if len(fingerprints) < self.n:
+            return False
+
+        counts = self.counts
+        seen = counts.get(hash_, 0)
+        counts[hash_] = seen + 1
+        recent = self.recent
+        recent.append(hash_)
+        if len(recent) > self.window:
+            oldest = recent.popleft()
+            count = counts[oldest] - 1
+            if count:
+                counts[oldest] = count
+            else:
+                del counts[oldest]
+        return seen >= self.limit
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+import heapq
+
+from swallows.util import OrderedSet
+
+# The Scheduler decides whose turn it is.
+#
+# Instead of every actor taking a turn, in order, round after round, the
+# Scheduler keeps a queue of actors ordered by the time at which they will
+# next be free to act.  Each action takes some amount of time (its duration,
+# given to the `action` decorator, 1 by default), and after an actor's turn
+# it goes back in the queue that much later -- the longest action it took
+# during the turn decides how much.  Actors who are free at the same time
+# take their turns in the order they became free, so when every action
+# takes 1, this is the same as the old round-robin.
+#
+# An actor can also go to sleep (see Animate.sleep): it is taken out of the
+# queue altogether, or put back at the time of its alarm, if it set one, and
+# costs nothing until then.  It is woken up (and put back in the queue, to
+# act as soon as possible) by someone entering the room it is in.
+#
+# Being addressed is more urgent: whether it is asleep or in the middle of
+# something that takes a while, an actor who is addressed gets to act as
+# soon as possible, so that it can answer before whoever addressed it has
+# gone somewhere else.
+#
+# If everyone is asleep with no alarm set, so that nothing would ever
+# happen again, everyone is woken up.
+#
+# If a `level_of_detail` function is given, it is asked, before each
+# actor's turn, whether that actor matters right now.  If it returns 0, the
+# actor takes its turn as usual; otherwise the actor only drifts (see
+# Animate.drift) and isn't asked again until that much time has passed.
+
+
+class Scheduler(object):
+    def __init__(self, actors, level_of_detail=None):
+        actors = list(actors)
+        if not actors:
+            raise ValueError("a Scheduler needs at least one actor")
+        self.now = 0
+        self.level_of_detail = level_of_detail
+        self.queue = []
+        # every entry in the queue gets the next serial number, which both
+        # breaks ties between actors who are free at the same time, and
+        # lets an actor's old entry be recognized, once it has a new one
+        self.serial = 0
+        self.sleepers = OrderedSet()
+        for actor in actors:
+            actor.scheduler = self
+            actor.asleep = False
+            self.schedule(actor, 0)
+
+    def schedule(self, actor, time):
+        self.serial += 1
+        actor.turn = self.serial
+        heapq.heappush(self.queue, (time, self.serial, actor))
+
+    def sleep(self, actor, duration=None):
+        actor.asleep = True
+        if duration is None:
+            actor.turn = None
+            self.sleepers.add(actor)
+        else:
+            self.schedule(actor, self.now + duration)
+
+    def wake(self, actor):
+        if not actor.asleep:
+            return
+        self.interrupt(actor)
+
+    def interrupt(self, actor):
+        actor.asleep = False
+        self.sleepers.discard(actor)
+        self.schedule(actor, self.now)
+
+    def next_actor(self):
+        """Removes the actor whose turn is next from the queue, moves the
+        clock on to its turn, and returns it.
+
+        """
+        while True:
+            if not self.queue:
+                # deadlock; wake everyone
+                for actor in list(self.sleepers):
+                    self.wake(actor)
+            (time, serial, actor) = heapq.heappop(self.queue)
+            if serial == actor.turn:
+                break
+            # otherwise, it's an entry which a newer one has replaced
+        self.now = time
+        actor.asleep = False
+        return actor
+
+    def take_turn(self):
+        """Lets the next actor take its turn, and puts it back in the queue
+        for when it will be free again.  Returns that actor.
+
+        """
+        actor = self.next_actor()
+        actor.busy = 0
+        drift = 0
+        if self.level_of_detail is not None:
+            drift = self.level_of_detail(actor)
+        if drift:
+            actor.drift()
+            actor.busy = drift
+        else:
+            actor.step()
+        if not actor.asleep:
+            self.schedule(actor, self.now + max(actor.busy, 1))
+        return actor
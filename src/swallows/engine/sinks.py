@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+import gzip
+import sys
+
+# Sinks are where the Publisher and the Editor write the novel to.
+#
+# Writes to a sink are buffered in memory until the sink is flushed, at
+# which point everything written since the last flush goes out in a single
+# write.  The Editor flushes after each paragraph and the Publisher after
+# each chapter's heading, so writing a novel takes a few hundred writes
+# instead of tens of thousands.
+
+
+class Sink(object):
+    def __init__(self):
+        self.buffer = []
+
+    def write(self, text):
+        self.buffer.append(text)
+
+    def flush(self):
+        if self.buffer:
+            self.write_out(''.join(self.buffer))
+            self.buffer = []
+
+    def write_out(self, text):
+        raise NotImplementedError(
+            'Please implement %s.write_out()' % self.__class__.__name__
+        )
+
+    def close(self):
+        self.flush()
+
+
+class NullSink(Sink):
+    """Throws everything away (for benchmarking, say.)"""
+    def write_out(self, text):
+        pass
+
+
+class MemorySink(Sink):
+    """Keeps everything written to it in memory."""
+    def __init__(self):
+        Sink.__init__(self)
+        self.chunks = []
+
+    def write_out(self, text):
+        self.chunks.append(text)
+
+    def getvalue(self):
+        self.flush()
+        return ''.join(self.chunks)
+
+
+class StreamSink(Sink):
+    """Writes to an already-open file-like object, such as sys.stdout."""
+    def __init__(self, stream=None):
+        Sink.__init__(self)
+        if stream is None:
+            stream = sys.stdout
+        self.stream = stream
+
+    def write_out(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+
+class FileSink(StreamSink):
+    """Writes to the named file, which it owns, and closes when closed."""
+    def __init__(self, path):
+        StreamSink.__init__(self, open(path, 'w'))
+
+    def write_out(self, text):
+        self.stream.write(text)
+
+    def close(self):
+        StreamSink.close(self)
+        self.stream.close()
+
+
+class GzipSink(FileSink):
+    """Writes to the named file, gzip-compressing it as it goes."""
+    def __init__(self, path):
+        StreamSink.__init__(self, gzip.open(path, 'wb'))
+
+
+def open_sink(path):
+    """Returns a sink which writes to the file at `path` -- compressed,
+    if its name ends in '.gz' -- or to standard output if `path` is '-'.
+
+    """
+    if path == '-':
+        return StreamSink(sys.stdout)
+    if path.endswith('.gz'):
+        return GzipSink(path)
+    return FileSink(path)
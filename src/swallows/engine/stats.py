@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+import json
+from timeit import default_timer as timer
+
+# Instrumentation for the Publisher.  If a Publisher is given a Stats,
+# it records, for each chapter:
+#
+# - the wall time spent in each phase of producing it: simulating, choosing
+#   paragraphs' events, optimizing paragraphs, and writing output.
+#   Phases may nest (in streaming mode the simulation runs *inside* the
+#   Editor's choosing of events) and the time of a nested phase is counted
+#   only towards that phase, not towards the phase it is nested in.
+# - how many times each phrase template was emitted as an event
+# - how many times each actor took each action (wander, pick_up, ...)
+#
+# After each chapter, its record is appended to `chapters`, and if a
+# `jsonl` stream was given, written to it as one line of JSON.
+
+
+class Phase(object):
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.children = 0.0
+        self.stats.phases.append(self)
+        self.start = timer()
+
+    def __exit__(self, *exc_info):
+        elapsed = timer() - self.start
+        self.stats.phases.pop()
+        if self.stats.phases:
+            self.stats.phases[-1].children += elapsed
+        self.stats.add_time(self.name, elapsed - self.children)
+
+
+class NullPhase(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_PHASE = NullPhase()
+
+
+def phase(stats, name):
+    """Returns a context manager which times the phase `name` in `stats`,
+    or does nothing if `stats` is None.
+
+    """
+    if stats is None:
+        return NULL_PHASE
+    return Phase(stats, name)
+
+
+class Stats(object):
+    def __init__(self, jsonl=None):
+        self.jsonl = jsonl
+        self.chapters = []
+        self.chapter = None
+        self.phases = []
+
+    def __getstate__(self):
+        # for sending a Publisher to a worker process; the worker only
+        # needs somewhere to record the chapter it is working on.
+        state = self.__dict__.copy()
+        state['jsonl'] = None
+        state['chapters'] = []
+        return state
+
+    def start_chapter(self, chapter_num):
+        self.chapter = {
+            'chapter': chapter_num,
+            'time': {},
+            'turns': 0,
+            'events': 0,
+            'phrases': {},
+            'actions': {},
+        }
+
+    def end_chapter(self):
+        self.add_chapter(self.chapter)
+        self.chapter = None
+
+    def add_chapter(self, record):
+        self.chapters.append(record)
+        if self.jsonl is not None:
+            self.jsonl.write(json.dumps(record, sort_keys=True) + '\n')
+            self.jsonl.flush()
+
+    def add_time(self, name, elapsed):
+        times = self.chapter['time']
+        times[name] = times.get(name, 0.0) + elapsed
+
+    def count_turns(self, turns):
+        self.chapter['turns'] += turns
+
+    def count_event(self, event):
+        self.chapter['events'] += 1
+        phrases = self.chapter['phrases']
+        phrases[event.phrase] = phrases.get(event.phrase, 0) + 1
+
+    def count_action(self, actor, action):
+        actions = self.chapter['actions'].setdefault(actor.name, {})
+        actions[action] = actions.get(action, 0) + 1
+
+    def totals(self):
+        """Returns a single record which sums up all the chapters."""
+        total = {
+            'chapters': len(self.chapters),
+            'time': {},
+            'turns': 0,
+            'events': 0,
+            'phrases': {},
+            'actions': {},
+        }
+        for record in self.chapters:
+            for (name, elapsed) in record['time'].iteritems():
+                total['time'][name] = total['time'].get(name, 0.0) + elapsed
+            total['turns'] += record['turns']
+            total['events'] += record['events']
+            for (phrase, count) in record['phrases'].iteritems():
+                total['phrases'][phrase] = total['phrases'].get(phrase, 0) + count
+            for (actor, actions) in record['actions'].iteritems():
+                totals = total['actions'].setdefault(actor, {})
+                for (action, count) in actions.iteritems():
+                    totals[action] = totals.get(action, 0) + count
+        return total
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+from array import array
+import json
+import os
+import sys
+
+from swallows.engine.eventlog import EventLog
+from swallows.engine.events import Publisher
+
+# Traces: a chapter's events, as the Editor saw them, saved to disk so that
+# the Editor can be run on them again without running the simulation.
+#
+# A trace file is a line identifying it as a trace, a line of JSON (the
+# header), and then the raw contents of an EventLog's columns (see
+# swallows.engine.eventlog), one after another.  Actors are saved by name,
+# and looked up by name in whatever world the trace is loaded into, so the
+# world must have the same things in it, but need not be in the same state.
+#
+# The header also has the state of the random number generator as it was
+# when the Editor started on the chapter, so the Editor makes the same
+# decisions when replaying the trace as it did the first time, and writes
+# the same chapter -- or, if the Editor has changed, a chapter which can
+# be compared with the old one.
+
+MAGIC = 'SWALLOWS-TRACE 1\n'
+
+COLUMNS = ('phrases', 'offsets', 'participants', 'locations', 'excls')
+
+
+def trace_path(trace_dir, chapter_num):
+    return os.path.join(trace_dir, 'chapter-%d.trace' % chapter_num)
+
+
+def write_trace(path, events, main_characters, rng):
+    """Writes the given events (an EventLog, or any EventCollector) to
+    a trace file at `path`, along with the names of the main characters
+    and the state of `rng`.
+
+    """
+    if isinstance(events, EventLog):
+        log = events
+    else:
+        log = EventLog()
+        for event in events.events:
+            log.collect(event)
+    header = {
+        'phrases': log.phrase_table,
+        'things': [thing.name for thing in log.thing_table],
+        'main_characters': [actor.name for actor in main_characters],
+        'rng_state': rng.getstate(),
+        'byteorder': sys.byteorder,
+        'columns': [(name, getattr(log, name).typecode,
+                     len(getattr(log, name))) for name in COLUMNS],
+    }
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(json.dumps(header) + '\n')
+        for name in COLUMNS:
+            f.write(getattr(log, name).tostring())
+
+
+def index_world(characters, setting):
+    """Returns a dict mapping the names of the characters, the locations
+    in the setting, and everything in them (and in those things, and so
+    on) to the things themselves.
+
+    """
+    things = {}
+
+    def add(thing):
+        other = things.get(thing.name)
+        if other is thing:
+            return
+        if other is not None:
+            raise ValueError("more than one thing is named %r" % thing.name)
+        things[thing.name] = thing
+        for x in thing.contents:
+            add(x)
+
+    for thing in tuple(setting) + tuple(characters):
+        add(thing)
+    return things
+
+
+def read_trace(path, things):
+    """Reads the trace file at `path` and returns a tuple of (EventLog,
+    list of main characters, random number generator state), looking up
+    actors by name in `things` (see index_world.)
+
+    """
+    with open(path, 'rb') as f:
+        if f.readline() != MAGIC:
+            raise ValueError("%s is not a trace file" % path)
+        header = json.loads(f.readline())
+
+        def lookup(name):
+            try:
+                return things[name]
+            except KeyError:
+                raise ValueError("%s refers to %r, which is not in this "
+                                 "world" % (path, name))
+
+        log = EventLog()
+        for phrase in header['phrases']:
+            log.phrase_id(intern(phrase.encode('utf-8')))
+        for name in header['things']:
+            log.thing_table.append(lookup(name))
+        for (name, typecode, length) in header['columns']:
+            column = array(str(typecode))
+            column.fromstring(f.read(length * column.itemsize))
+            if header['byteorder'] != sys.byteorder:
+                column.byteswap()
+            setattr(log, name, column)
+
+    main_characters = [lookup(name) for name in header['main_characters']]
+    (version, internal_state, gauss_next) = header['rng_state']
+    rng_state = (version, tuple(internal_state), gauss_next)
+    return (log, main_characters, rng_state)
+
+
+### PUBLISHERS ###
+
+class RecordingPublisher(Publisher):
+    """A Publisher which, as well as publishing each chapter, saves a
+    trace of it in `trace_dir`.
+
+    """
+    def __init__(self, trace_dir, **kwargs):
+        Publisher.__init__(self, **kwargs)
+        if self.streaming:
+            # the Editor would be running in the middle of the simulation,
+            # so there'd be no one state of the rng to save
+            raise ValueError("traces can't be recorded in streaming mode")
+        self.trace_dir = trace_dir
+        if not os.path.isdir(trace_dir):
+            os.makedirs(trace_dir)
+
+    def edit_chapter(self, chapter_num, events, main_characters):
+        write_trace(trace_path(self.trace_dir, chapter_num), events,
+                    main_characters, self.rng)
+        Publisher.edit_chapter(self, chapter_num, events, main_characters)
+
+
+class ReplayingPublisher(Publisher):
+    """A Publisher which, instead of simulating each chapter, reads its
+    events from a trace in `trace_dir` (made by a RecordingPublisher)
+    and only edits them.  The characters and setting need to be those of
+    the world the traces were recorded in (or at least, have the same
+    names), but they need not be in the same state.
+
+    """
+    def __init__(self, trace_dir, **kwargs):
+        Publisher.__init__(self, **kwargs)
+        self.trace_dir = trace_dir
+
+    def publish_chapter(self, chapter_num):
+        if self.stats is not None:
+            self.stats.start_chapter(chapter_num)
+        things = index_world(self.characters, self.setting)
+        (log, main_characters, rng_state) = read_trace(
+            trace_path(self.trace_dir, chapter_num), things
+        )
+        self.rng.setstate(rng_state)
+        self.edit_chapter(chapter_num, log, main_characters)
+        if self.stats is not None:
+            self.stats.end_chapter()
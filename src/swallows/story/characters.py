@@ -1,12 +1,12 @@
 #!/usr/bin/env python
 
-import random
 import sys
 
 from swallows.engine.objects import (
-    Animate, ProperMixin, MasculineMixin, FeminineMixin,
-    Topic,
+    Animate, Location, ProperMixin, MasculineMixin, FeminineMixin,
+    Topic, action,
     GreetTopic, SpeechTopic, QuestionTopic,
+    TREASURE, WEAPON, HORROR, ANIMATE,
 )
 from swallows.util import pick
 
@@ -19,8 +19,6 @@ from swallows.util import pick
 # ...they check that the brandy is still in the liquor cabinet.  is this
 #   really necessary?
 # certain things can't be taken, but can be dragged (like the body)
-# path-finder between any two rooms -- not too difficult, even if it
-#   would be nicer in Prolog.
 # "it was so nice" -- actually *have* memories of locations, and feelings
 #   (good/bad, 0 to 10 or something) about memories
 # anxiety memory = the one they're most recently panicked about
@@ -36,24 +34,26 @@ from swallows.util import pick
 ### some Swallows-specific topics (sort of)
 
 class WhereQuestionTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class ThreatGiveMeTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class ThreatTellMeTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class ThreatAgreeTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 ### Base character personalities for The Swallows
 
 class Character(Animate):
+    __slots__ = ('revolver', 'brandy', 'dead_body')
+
     def __init__(self, name, location=None, collector=None,
                  revolver=None, brandy=None, dead_body=None):
         """Constructor specific to characters.  In it, we set up some
@@ -75,35 +75,35 @@ class Character(Animate):
 
         """
         Animate.move_to(self, location)
-        if random.randint(0, 10) == 0:
+        if self.rng.randint(0, 10) == 0:
             self.emit("It was so nice being in <2> again",
              [self, self.location], excl=True)
         
         # okay, look around you.
-        for x in self.location.contents:
+        for x in self.location.contents.notables:
             assert x.location == self.location
             if x == self:
                 continue
-            if x.horror():
+            if x.flags & HORROR:
                 memory = self.recall(x)
                 if memory:
-                    amount = pick(['shudder', 'wave'])
-                    emotion = pick(['fear', 'disgust', 'sickness', 'loathing'])
+                    amount = pick(['shudder', 'wave'], self.rng)
+                    emotion = pick(['fear', 'disgust', 'sickness', 'loathing'], self.rng)
                     self.emit("<1> felt a %s of %s as <he-1> looked at <2>" % (amount, emotion), [self, x])
                     self.remember(x, self.location)
                 else:
-                    verb = pick(['screamed', 'yelped', 'went pale'])
+                    verb = pick(['screamed', 'yelped', 'went pale'], self.rng)
                     self.emit("<1> %s at the sight of <indef-2>" % verb, [self, x], excl=True)
                     self.remember(x, self.location)
                     self.nerves = 'shaken'
-            elif x.animate():
+            elif x.flags & ANIMATE:
                 other = x
                 self.emit("<1> saw <2>", [self, other])
                 other.emit("<1> saw <2> walk into the %s" % self.location.noun(), [other, self])
                 self.remember(x, self.location)
                 self.greet(x, "'Hello, <2>,' said <1>")
-                for y in other.contents:
-                    if y.treasure():
+                for y in other.contents.notables:
+                    if y.flags & TREASURE:
                         self.emit(
                             "<1> noticed <2> <was-2> carrying <indef-3>",
                             [self, other, y])
@@ -129,10 +129,32 @@ class Character(Animate):
                                 "'Tell me where you have hidden <3>, <2>, or I shall shoot you,' <he-1> said",
                                 [self, other, thing])
                             return
-            elif x.notable():
+            else:
                 self.emit("<1> saw <2>", [self, x])
                 self.remember(x, self.location)
 
+    def behave(self):
+        """Most turns are decided afresh, by live().  But when we set
+        off to fetch something, the whole trip is one plan, which we carry
+        on with from turn to turn (answering anyone who speaks to us on
+        the way) until it's done.
+
+        """
+        while True:
+            errand = None
+            if self.topic is None and self.desirable_here() is None:
+                errand = self.choose_errand()
+            if errand is None:
+                self.live()
+                yield
+                continue
+            for step in errand:
+                yield
+                # if someone spoke to us, answer them before carrying on
+                while self.topic is not None:
+                    self.converse(self.topic)
+                    yield
+
     def live(self):
         """Override some behaviour for taking a turn in the story.
 
@@ -143,34 +165,33 @@ class Character(Animate):
 
         # otherwise, if there are items here that you desire, you *must* pick
         # them up.
-        for x in self.location.contents:
-            if x.treasure() or x.weapon() or x in self.desired_items:
-                self.pick_up(x)
-                return
-        people_about = False
+        x = self.desirable_here()
+        if x is not None:
+            self.pick_up(x)
+            return
 
         # otherwise, fixate on some valuable object (possibly the revolver)
         # that you are carrying:
         fixated_on = None
-        for y in self.contents:
-            if y.treasure():
+        for y in self.contents.notables:
+            if y.flags & TREASURE:
                 fixated_on = y
                 break
-        if not fixated_on and random.randint(0, 20) == 0 and self.revolver.location == self:
+        if not fixated_on and self.rng.randint(0, 20) == 0 and self.revolver.location == self:
             fixated_on = self.revolver
 
         # check if you are alone
-        for x in self.location.contents:
-            if x.animate() and x is not self:
-                people_about = True
+        people_about = len(self.location.contents.animates) > 1
 
-        choice = random.randint(0, 25)
+        choice = self.rng.randint(0, 25)
         if choice < 10 and not people_about:
             return self.hide_and_seek(fixated_on)
         if choice < 20:
             return self.wander()
         if choice == 20:
             self.emit("<1> yawned", [self])
+            # and dozes off for a bit, unless someone comes along
+            self.sleep(self.rng.randint(5, 20))
         elif choice == 21:
             self.emit("<1> gazed thoughtfully into the distance", [self])
         elif choice == 22:
@@ -182,28 +203,104 @@ class Character(Animate):
         else:
             return self.wander()
 
+    def desirable_here(self):
+        """Returns something here which we desire and can take, or None.
+        (we only look at things that can be taken; you can desire other
+        things, but you can't pick them up.)
+
+        """
+        for x in self.location.contents.takeables:
+            if x.flags & (TREASURE | WEAPON) or x in self.desired_items:
+                return x
+        return None
+
+    def choose_errand(self):
+        """If we remember something we desire being in some other room
+        (that we can get to), returns a plan to fetch it; otherwise None.
+
+        """
+        for x in self.desired_items:
+            room = self.where_to_find(x)
+            if (room is not None and room is not self.location and
+                self.location.next_hop(room) is not None):
+                return self.fetch(x, room)
+        return None
+
+    def fetch(self, thing, room):
+        """A plan: go to `room`, where we remember `thing` being, get it,
+        and come back to where we started.
+
+        """
+        origin = self.location
+        while self.location is not room:
+            if not self.head_towards(room):
+                return
+            yield
+
+        memory = self.recall(thing)
+        if memory is None:
+            return
+        if memory.location is room:
+            if thing.location is not room:
+                del self.memories[thing]
+                return
+            self.pick_up(thing)
+        elif memory.location in room.contents.containers:
+            container = memory.location
+            if memory.i_hid_it_there:
+                self.emit("<1> retrieved <3> <he-1> had hidden in <2>",
+                          [self, container, thing])
+            else:
+                self.emit("<1> retrieved <3> from <2>",
+                          [self, container, thing])
+            if thing.location is not container:
+                self.emit("But <he-2> <was-2> missing", [self, thing], excl=True)
+                del self.memories[thing]
+                return
+            thing.move_to(self)
+            self.remember(thing, self)
+        else:
+            return
+        yield
+
+        while self.location is not origin:
+            if not self.head_towards(origin):
+                return
+            yield
+
+    def where_to_find(self, thing):
+        """Returns the location where we remember `thing` being (possibly
+        in a container there), or None if we don't remember it, or
+        remember someone having it.
+
+        """
+        memory = self.recall(thing)
+        if memory is None:
+            return None
+        place = memory.location
+        while place is not None and not isinstance(place, Location):
+            if place.flags & ANIMATE:
+                return None
+            place = place.location
+        return place
+
     #
     # The following are fairly Swallows-specific methods.
     #
 
+    @action(duration=2)
     def hide_and_seek(self, fixated_on):
         # check for some place to hide the thing you're fixating on
         containers = []
-        for x in self.location.contents:
-            if x.container():
-                # did I hide something here previously?
-                memories = []
-                for thing in self.memories:
-                    memory = self.recall(thing)
-                    if memory.location == x:
-                        memories.append(memory)
-                containers.append((x, memories))
+        for x in self.location.contents.containers:
+            # did I hide something here previously?
+            containers.append((x, self.memories.at(x)))
         if not containers:
             return self.wander()
         # ok!  we now have a list of containers, each of which has zero or
         # more memories of things being in it.
         if fixated_on:
-            (container, memories) = pick(containers)
+            (container, memories) = pick(containers, self.rng)
             self.emit("<1> hid <2> in <3>", [self, fixated_on, container])
             fixated_on.move_to(container)
             self.remember(fixated_on, container, i_hid_it_there=True)
@@ -211,14 +308,14 @@ class Character(Animate):
         else:
             # we're looking for treasure!
             # todo: it would maybe be better to prioritize this selection
-            (container, memories) = pick(containers)
+            (container, memories) = pick(containers, self.rng)
             # sometimes, we don't care what we think we know about something
             # (this lets us, for example, explore things in hopes of brandy)
-            if memories and random.randint(0, 3) == 0:
+            if memories and self.rng.randint(0, 3) == 0:
                 memories = None
             if memories:
-                memory = pick(memories)
-                picking_up = random.randint(0, 5) == 0
+                memory = pick(memories, self.rng)
+                picking_up = self.rng.randint(0, 5) == 0
                 if memory.subject is self.revolver:
                     picking_up = True
                 if picking_up:
@@ -249,14 +346,15 @@ class Character(Animate):
                 for thing in container.contents:
                     # remember what you saw whilst searching this container
                     self.remember(thing, container)
-                    if thing.treasure() or thing.weapon() or thing in self.desired_items:
+                    if thing.flags & (TREASURE | WEAPON) or thing in self.desired_items:
                         desired_things.append(thing)
                 if desired_things:
-                    thing = pick(desired_things)
+                    thing = pick(desired_things, self.rng)
                     self.emit("<1> found <2> there, and took <him-2>", [self, thing])
                     thing.move_to(self)
                     self.remember(thing, self)
 
+    @action
     def converse(self, topic):
         self.topic = None
         other = topic.originator
@@ -288,36 +386,35 @@ class Character(Animate):
                 # this is not really a *memory*, btw, it's a *belief*
                 other.remember(topic.subject, memory.location)
         elif isinstance(topic, ThreatAgreeTopic):
-            decision = self.what_to_do_about[topic.subject]
             self.speak_to(other,
                "'You make a persuasive case for remaining undecided, <2>,' said <1>",
                [self, other])
-            del self.what_to_do_about[topic.subject]
-            del other.other_decision_about[topic.subject]
+            # we may not have made up our mind yet (in which case, well,
+            # we remain undecided all the more.)
+            self.what_to_do_about.pop(topic.subject, None)
+            other.other_decision_about.pop(topic.subject, None)
         elif isinstance(topic, GreetTopic):
             # emit, because making this a speak_to leads to too much silliness
-            self.emit("'Hello, <2>,' replied <1>", [self, other])
-            # but otoh this sort of thing does not scale:
-            other.emit("'Hello, <2>,' replied <1>", [self, other])
+            self.emit("'Hello, <2>,' replied <1>", [self, other],
+                      observers=(self, other))
             # this needs to be more general
             self_memory = self.recall(self.dead_body)
             if self_memory:
                 self.discuss(other, self_memory)
                 return
             # this need not be *all* the time
-            for x in other.contents:
-                if x.notable():
-                    self.remember(x, other)
-                    self.speak_to(other, "'I see you are carrying <indef-3>,' said <1>", [self, other, x])
-                    return
-            choice = random.randint(0, 3)
+            for x in other.contents.notables:
+                self.remember(x, other)
+                self.speak_to(other, "'I see you are carrying <indef-3>,' said <1>", [self, other, x])
+                return
+            choice = self.rng.randint(0, 3)
             if choice == 0:
                 self.question(other, "'Lovely weather we're having, isn't it?' asked <1>")
             if choice == 1:
                 self.speak_to(other, "'I was wondering where you were,' said <1>")
         elif isinstance(topic, QuestionTopic):
             if topic.subject is not None:
-                choice = random.randint(0, 1)
+                choice = self.rng.randint(0, 1)
                 if choice == 0:
                     self.speak_to(other, "'I know nothing about <3>, <2>,' explained <1>",
                        [self, other, topic.subject])
@@ -341,7 +438,7 @@ class Character(Animate):
                     [self, other, topic.subject])
                 self.put_down(topic.subject)
             else:
-                if topic.subject.location.animate():
+                if topic.subject.location.flags & ANIMATE:
                     self.speak_to(other,
                         "'I think <3> has <4>,', <1> recalled",
                         [self, other, memory.location, topic.subject])
@@ -352,7 +449,7 @@ class Character(Animate):
                 # again, belief.  hearsay.  not a memory, really.
                 other.remember(topic.subject, memory.location)
         elif isinstance(topic, SpeechTopic):
-            choice = random.randint(0, 5)
+            choice = self.rng.randint(0, 5)
             if choice == 0:
                 self.emit("<1> nodded", [self])
             if choice == 1:
@@ -371,6 +468,7 @@ class Character(Animate):
                 self.speak_to(other, "'I see, <2>, I see,' said <1>")
 
     # this is its own method for indentation reasons
+    @action
     def discuss(self, other, self_memory):
         # in general, characters should not be able to read each other's
         # minds.  however, it's convenient here.  besides, their face would
@@ -383,7 +481,7 @@ class Character(Animate):
                subject=self_memory.subject)
             return
         if self_memory and other_memory:
-            choice = random.randint(0, 2)
+            choice = self.rng.randint(0, 2)
             if choice == 0:
                 self.question(other, "'Do you think we should do something about <3>?' asked <1>",
                     [self, other, self_memory.subject])
@@ -407,7 +505,7 @@ class Character(Animate):
                             [self, other, self_memory.subject],
                             subject=self.brandy)
                         self.desired_items.add(self.brandy)
-                        if random.randint(0, 1) == 0:
+                        if self.rng.randint(0, 1) == 0:
                             self.address(other, WhereQuestionTopic(self, subject=self.brandy),
                                 "'Where did you say <3> was?'",
                                 [self, other, self.brandy])
@@ -418,6 +516,7 @@ class Character(Animate):
                         self.desired_items.add(self.brandy)
 
     # this is its own method for indentation reasons
+    @action
     def decide_what_to_do_about(self, other, thing):
         phrase = {
             'call': 'call the police',
@@ -427,7 +526,7 @@ class Character(Animate):
         # character has, oh, i don't know, put the other at
         # gunpoint yet, or not, or something
         if self.what_to_do_about.get(thing) is None:
-            if random.randint(0, 1) == 0:
+            if self.rng.randint(0, 1) == 0:
                 self.what_to_do_about[thing] = 'call'
             else:
                 self.what_to_do_about[thing] = 'dispose'
@@ -464,8 +563,8 @@ class Character(Animate):
 
 
 class MaleCharacter(MasculineMixin, ProperMixin, Character):
-    pass
+    __slots__ = ()
 
 
 class FemaleCharacter(FeminineMixin, ProperMixin, Character):
-    pass
+    __slots__ = ()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+import random
+
+from swallows.engine.objects import (
+    Location, Treasure, PluralTreasure, Container, Item, Weapon, Horror,
+    World
+)
+from swallows.story.characters import MaleCharacter, FemaleCharacter
+from swallows.story.world import build_world
+from swallows.util import pick
+
+# A generator of worlds much bigger than the house in swallows.story.world,
+# for finding out how the engine copes with big worlds: a sprawling estate
+# of rooms, cupboards, treasures and weapons, with as many characters
+# wandering about in it as you like.  (They are all in the same story as
+# Alice and Bob -- one revolver, one bottle of brandy, one dead body.)
+#
+# Every room, container, item and character gets a name of its own, so that
+# a trace (see swallows.engine.traces) of a generated world can be replayed.
+
+ADJECTIVES = (
+    'blue', 'green', 'yellow', 'crimson', 'grey', 'panelled', 'draughty',
+    'gloomy', 'sunny', 'long', 'small', 'octagonal', 'east', 'west',
+    'north', 'south', 'old', 'new', 'dusty', 'gilded',
+)
+
+ROOMS = (
+    'parlour', 'drawing room', 'library', 'gallery', 'conservatory',
+    'corridor', 'bedroom', 'nursery', 'pantry', 'scullery', 'larder',
+    'ballroom', 'billiard room', 'smoking room', 'music room', 'study',
+    'attic', 'cellar', 'landing', 'sitting room', 'dressing room',
+    'morning room', 'gun room', 'boot room', 'laundry',
+)
+
+CONTAINERS = (
+    'cupboard', 'wardrobe', 'chest', 'bureau', 'dresser', 'trunk',
+    'sideboard', 'hamper', 'writing desk', 'cabinet',
+)
+
+TREASURES = (
+    'golden falcon', 'jade idol', 'silver salver', 'ruby brooch',
+    'Ming vase', 'Faberge egg', 'emerald tiara', 'ivory chess set',
+)
+
+PLURAL_TREASURES = (
+    'stolen jewels', 'gold sovereigns', 'pearl earrings', 'bearer bonds',
+)
+
+WEAPONS = (
+    'dagger', 'candlestick', 'lead pipe', 'poker', 'sword cane',
+)
+
+MALE_NAMES = (
+    'Albert', 'Basil', 'Cedric', 'Desmond', 'Edmund', 'Frederick', 'Gerald',
+    'Horace', 'Ivor', 'Jasper', 'Lionel', 'Montague', 'Nigel', 'Oswald',
+    'Percival', 'Rupert', 'Sebastian', 'Tobias', 'Wilfred', 'Xavier',
+)
+
+FEMALE_NAMES = (
+    'Agatha', 'Beatrice', 'Clementine', 'Dorothea', 'Edith', 'Florence',
+    'Gwendolyn', 'Harriet', 'Imogen', 'Josephine', 'Lavinia', 'Mildred',
+    'Nora', 'Ophelia', 'Philippa', 'Rosalind', 'Sybil', 'Theodora',
+    'Violet', 'Winifred',
+)
+
+SURNAMES = (
+    'Ashworth', 'Blenkinsop', 'Carruthers', 'Dalrymple', 'Fotheringay',
+    'Grimsby', 'Hargreaves', 'Inglethorp', 'Marchbanks', 'Pettigrew',
+    'Quigley', 'Ravensworth', 'Smythe', 'Thistlewood', 'Warburton',
+)
+
+
+def unique_names(rng, *parts):
+    """Returns an infinite iterator over distinct names, made by joining
+    one word from each of `parts`, in a random order.  Once every
+    combination has been used, they are used again with ' no. 2' (and
+    then ' no. 3', and so on) after them.
+
+    """
+    combinations = ['']
+    for words in parts:
+        combinations = [('%s %s' % (c, w)).strip()
+                        for c in combinations for w in words]
+    rng.shuffle(combinations)
+    round_ = 1
+    while True:
+        for name in combinations:
+            if round_ == 1:
+                yield name
+            else:
+                yield '%s no. %d' % (name, round_)
+        round_ += 1
+
+
+def build_world_or_estate(rng=random, rooms=None, cast=100):
+    """Builds the house of _The Swallows_ if `rooms` is None, and
+    otherwise an estate of that many rooms with `cast` characters.  (So
+    that the size of the world can be given to a Farm as part of each
+    job, and the right world built again when the job is resumed.)
+
+    """
+    if rooms is None:
+        return build_world(rng=rng)
+    return build_estate(rng=rng, rooms=rooms, characters=cast)
+
+
+def build_estate(rng=random, rooms=1000, characters=100, containers=None,
+                 treasures=None, weapons=None):
+    """Builds a randomly generated world of `rooms` rooms, all reachable
+    from one another, and `characters` characters, and returns it as a
+    World.  By default there is a container in every third room, a
+    treasure for every ten rooms, and a weapon (besides the revolver) for
+    every twenty; `containers`, `treasures` and `weapons` give other
+    numbers of them.
+
+    `rng` makes every random decision, so building with the same seed
+    gives the same world.
+
+    """
+    # with only one room, there would be nowhere to go; and with nobody in
+    # it, nothing would ever happen
+    if rooms < 2:
+        raise ValueError("an estate needs at least 2 rooms, not %d" % rooms)
+    if characters < 1:
+        raise ValueError("an estate needs at least 1 character, not %d" %
+                         characters)
+    if containers is None:
+        containers = (rooms + 2) // 3
+    if treasures is None:
+        treasures = max(1, rooms // 10)
+    if weapons is None:
+        weapons = rooms // 20
+
+    room_names = unique_names(rng, ADJECTIVES, ROOMS)
+    locations = [Location(next(room_names)) for n in range(rooms)]
+
+    # connect each room to one before it, so that every room can be
+    # reached from every other, and now and then to a second one, so
+    # that there is more than one way around
+    exits = [[] for location in locations]
+    for n in range(1, rooms):
+        neighbours = set([rng.randint(0, n - 1)])
+        if rng.randint(0, 3) == 0:
+            neighbours.add(rng.randint(0, n - 1))
+        for m in sorted(neighbours):
+            exits[n].append(locations[m])
+            exits[m].append(locations[n])
+    for (location, its_exits) in zip(locations, exits):
+        location.set_exits(*its_exits)
+
+    # at most one of each kind of container in a room, so that we can name
+    # them after the room
+    container_list = []
+    spaces = [(noun, location) for location in locations
+              for noun in CONTAINERS]
+    for (noun, location) in rng.sample(spaces, min(containers, len(spaces))):
+        container_list.append(Container('%s in the %s' % (noun, location.name),
+                                        location=location))
+    places = locations + container_list
+
+    treasure_names = unique_names(rng, TREASURES + PLURAL_TREASURES)
+    treasure_list = []
+    for n in range(treasures):
+        name = next(treasure_names)
+        if name.split(' no. ')[0] in PLURAL_TREASURES:
+            treasure_class = PluralTreasure
+        else:
+            treasure_class = Treasure
+        treasure_list.append(treasure_class(name, location=pick(places, rng)))
+
+    weapon_names = unique_names(rng, WEAPONS)
+    weapon_list = [Weapon(next(weapon_names), location=pick(places, rng))
+                   for n in range(weapons)]
+
+    brandy = Item('bottle of brandy', location=pick(places, rng))
+    revolver = Weapon('revolver', location=pick(places, rng))
+    dead_body = Horror('dead body', location=pick(locations, rng))
+
+    male_names = unique_names(rng, MALE_NAMES, SURNAMES)
+    female_names = unique_names(rng, FEMALE_NAMES, SURNAMES)
+    cast = []
+    for n in range(characters):
+        if n % 2 == 0:
+            character = FemaleCharacter(next(female_names),
+                revolver=revolver, brandy=brandy, dead_body=dead_body)
+        else:
+            character = MaleCharacter(next(male_names),
+                revolver=revolver, brandy=brandy, dead_body=dead_body)
+        cast.append(character)
+
+    items = tuple(treasure_list) + tuple(weapon_list) + (revolver, brandy)
+    return World(
+        setting=tuple(locations),
+        characters=tuple(cast),
+        items=items,
+        containers=tuple(container_list),
+        brandy=brandy,
+        revolver=revolver,
+        dead_body=dead_body,
+    )
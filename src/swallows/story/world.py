@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 
+import random
+
 from swallows.engine.objects import (
     Location, ProperLocation, Treasure, PluralTreasure,
     Container, ProperContainer,
-    Item, Weapon, Horror
+    Item, Weapon, Horror, World
 )
 from swallows.story.characters import MaleCharacter, FemaleCharacter
 from swallows.util import pick
@@ -25,63 +27,106 @@ from swallows.util import pick
 
 ### world ###
 
-kitchen = Location('kitchen')
-living_room = Location('living room')
-dining_room = Location('dining room')
-front_hall = Location('front hall')
-driveway = Location('driveway', noun="driveway")
-garage = Location('garage', noun="garage")
-path_by_the_shed = Location('path by the shed', noun="path")
-shed = Location('shed', noun="shed")
-upstairs_hall = Location('upstairs hall')
-study = Location('study')
-bathroom = Location('bathroom')
-bobs_bedroom = ProperLocation("Bob's bedroom")
-alices_bedroom = ProperLocation("Alice's bedroom")
-
-kitchen.set_exits(dining_room, front_hall)
-living_room.set_exits(dining_room, front_hall)
-dining_room.set_exits(living_room, kitchen)
-front_hall.set_exits(kitchen, living_room, driveway, upstairs_hall)
-driveway.set_exits(front_hall, garage, path_by_the_shed)
-garage.set_exits(driveway)
-path_by_the_shed.set_exits(driveway, shed)
-shed.set_exits(path_by_the_shed)
-upstairs_hall.set_exits(bobs_bedroom, alices_bedroom, front_hall, study, bathroom)
-bobs_bedroom.set_exits(upstairs_hall)
-alices_bedroom.set_exits(upstairs_hall)
-study.set_exits(upstairs_hall)
-bathroom.set_exits(upstairs_hall)
-
-house = (kitchen, living_room, dining_room, front_hall, driveway, garage,
-         upstairs_hall, bobs_bedroom, alices_bedroom, study, bathroom,
-         path_by_the_shed, shed)
-
-falcon = Treasure('golden falcon', location=dining_room)
-jewels = PluralTreasure('stolen jewels', location=garage)
-
-cupboards = Container('cupboards', location=kitchen)
-liquor_cabinet = Container('liquor cabinet', location=dining_room)
-mailbox = Container('mailbox', location=driveway)
-
-bobs_bed = ProperContainer("Bob's bed", location=bobs_bedroom)
-alices_bed = ProperContainer("Alice's bed", location=alices_bedroom)
-
-brandy = Item('bottle of brandy', location=liquor_cabinet)
-revolver = Weapon('revolver', location=pick([bobs_bed, alices_bed]))
-dead_body = Horror('dead body', location=bathroom)
-
-# when making alice and bob, we let them recognize certain important
-# objects in their world
-alice = FemaleCharacter('Alice',
-    revolver=revolver,
-    brandy=brandy,
-    dead_body=dead_body,
-)
-bob = MaleCharacter('Bob',
-    revolver=revolver,
-    brandy=brandy,
-    dead_body=dead_body,
-)
+def build_world(rng=random):
+    """Builds a fresh copy of the world of _The Swallows_ and returns it
+    as a World.  Every call returns a brand new house, with brand new
+    things in it and a brand new Alice and Bob, so several worlds can be
+    used in the same process without one's events leaking into another.
+
+    `rng` is used for the few things that are decided randomly when the
+    world is made (like which bed the revolver is in.)
+
+    """
+    kitchen = Location('kitchen')
+    living_room = Location('living room')
+    dining_room = Location('dining room')
+    front_hall = Location('front hall')
+    driveway = Location('driveway', noun="driveway")
+    garage = Location('garage', noun="garage")
+    path_by_the_shed = Location('path by the shed', noun="path")
+    shed = Location('shed', noun="shed")
+    upstairs_hall = Location('upstairs hall')
+    study = Location('study')
+    bathroom = Location('bathroom')
+    bobs_bedroom = ProperLocation("Bob's bedroom")
+    alices_bedroom = ProperLocation("Alice's bedroom")
+
+    kitchen.set_exits(dining_room, front_hall)
+    living_room.set_exits(dining_room, front_hall)
+    dining_room.set_exits(living_room, kitchen)
+    front_hall.set_exits(kitchen, living_room, driveway, upstairs_hall)
+    driveway.set_exits(front_hall, garage, path_by_the_shed)
+    garage.set_exits(driveway)
+    path_by_the_shed.set_exits(driveway, shed)
+    shed.set_exits(path_by_the_shed)
+    upstairs_hall.set_exits(bobs_bedroom, alices_bedroom, front_hall, study, bathroom)
+    bobs_bedroom.set_exits(upstairs_hall)
+    alices_bedroom.set_exits(upstairs_hall)
+    study.set_exits(upstairs_hall)
+    bathroom.set_exits(upstairs_hall)
+
+    house = (kitchen, living_room, dining_room, front_hall, driveway, garage,
+             upstairs_hall, bobs_bedroom, alices_bedroom, study, bathroom,
+             path_by_the_shed, shed)
+
+    falcon = Treasure('golden falcon', location=dining_room)
+    jewels = PluralTreasure('stolen jewels', location=garage)
+
+    cupboards = Container('cupboards', location=kitchen)
+    liquor_cabinet = Container('liquor cabinet', location=dining_room)
+    mailbox = Container('mailbox', location=driveway)
+
+    bobs_bed = ProperContainer("Bob's bed", location=bobs_bedroom)
+    alices_bed = ProperContainer("Alice's bed", location=alices_bedroom)
+
+    brandy = Item('bottle of brandy', location=liquor_cabinet)
+    revolver = Weapon('revolver', location=pick([bobs_bed, alices_bed], rng))
+    dead_body = Horror('dead body', location=bathroom)
+
+    # when making alice and bob, we let them recognize certain important
+    # objects in their world
+    alice = FemaleCharacter('Alice',
+        revolver=revolver,
+        brandy=brandy,
+        dead_body=dead_body,
+    )
+    bob = MaleCharacter('Bob',
+        revolver=revolver,
+        brandy=brandy,
+        dead_body=dead_body,
+    )
+
+    ALL_ITEMS = (falcon, jewels, revolver, brandy)
 
-ALL_ITEMS = (falcon, jewels, revolver, brandy)
+    return World(
+        setting=house,
+        characters=(alice, bob),
+        items=ALL_ITEMS,
+        house=house,
+        ALL_ITEMS=ALL_ITEMS,
+        kitchen=kitchen,
+        living_room=living_room,
+        dining_room=dining_room,
+        front_hall=front_hall,
+        driveway=driveway,
+        garage=garage,
+        path_by_the_shed=path_by_the_shed,
+        shed=shed,
+        upstairs_hall=upstairs_hall,
+        study=study,
+        bathroom=bathroom,
+        bobs_bedroom=bobs_bedroom,
+        alices_bedroom=alices_bedroom,
+        falcon=falcon,
+        jewels=jewels,
+        cupboards=cupboards,
+        liquor_cabinet=liquor_cabinet,
+        mailbox=mailbox,
+        bobs_bed=bobs_bed,
+        alices_bed=alices_bed,
+        brandy=brandy,
+        revolver=revolver,
+        dead_body=dead_body,
+        alice=alice,
+        bob=bob,
+    )
@@ -1,4 +1,58 @@
+from collections import OrderedDict
+import cPickle as pickle
 import random
+import sys
 
-def pick(l):
-    return l[random.randint(0, len(l)-1)]
+
+def pick(l, rng=random):
+    return l[rng.randint(0, len(l)-1)]
+
+
+def pickle_world(obj, setting):
+    """Pickles `obj`, which has the world in it, and returns the pickle.
+    Pickling follows exits from room to room, so a big `setting` can go
+    deeper than Python's usual recursion limit; it is raised to allow
+    for it while pickling.
+
+    """
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(recursion_limit, 10 * len(setting) + 1000))
+    try:
+        return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+
+
+class OrderedSet(object):
+    """A set which iterates in the order things were added to it.
+
+    Actors hash by identity, so iterating an ordinary set of them gives
+    an order which depends on where they happened to be allocated, and
+    so the same random seed would not give the same novel twice.
+
+    """
+    def __init__(self, items=()):
+        self._items = OrderedDict()
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        self._items[item] = None
+
+    def remove(self, item):
+        del self._items[item]
+
+    def discard(self, item):
+        self._items.pop(item, None)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return 'OrderedSet(%r)' % list(self._items)
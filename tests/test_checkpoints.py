@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import os
+from os.path import realpath, dirname, join
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(__file__)), '..', 'src'))
+
+from swallows.engine.checkpoints import CheckpointingPublisher, chapter_path
+from swallows.engine.events import Publisher
+from swallows.engine.sinks import MemorySink
+from swallows.story.world import build_world
+
+
+class CheckpointsTest(unittest.TestCase):
+    def setUp(self):
+        self.checkpoint_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.checkpoint_dir)
+
+    def publisher(self, publisher_class=CheckpointingPublisher, seed=5,
+                  **kwargs):
+        if publisher_class is CheckpointingPublisher:
+            kwargs['checkpoint_dir'] = self.checkpoint_dir
+        rng = random.Random(seed)
+        world = build_world(rng=rng)
+        return publisher_class(
+            characters=world.characters,
+            setting=world.setting,
+            chapters=4,
+            events_per_chapter=150,
+            rng=rng,
+            sink=MemorySink(),
+            main_characters=world.characters[:1],
+            max_repeats=2,
+            **kwargs
+        )
+
+    def publish(self, publisher):
+        publisher.publish()
+        return publisher.sink.getvalue()
+
+    def test_checkpointing_gives_the_same_novel(self):
+        self.assertEqual(self.publish(self.publisher()),
+                         self.publish(self.publisher(Publisher)))
+
+    def test_resume_gives_the_same_novel(self):
+        text = self.publish(self.publisher())
+        for chapter_num in (3, 4):
+            os.remove(chapter_path(self.checkpoint_dir, chapter_num))
+        # the world and rng are restored from the checkpoint, so it makes
+        # no difference that they start out different
+        publisher = self.publisher(seed=6)
+        self.assertEqual(publisher.resume_point(), 3)
+        publisher.restore()
+        self.assertEqual(self.publish(publisher), text)
+
+    def test_writing_a_chapter_again_gives_the_same_novel(self):
+        text = self.publish(self.publisher())
+        publisher = self.publisher(seed=6)
+        publisher.restore(2)
+        self.assertEqual(self.publish(publisher), text)
+
+    def test_cannot_start_after_a_missing_chapter(self):
+        self.publish(self.publisher())
+        os.remove(chapter_path(self.checkpoint_dir, 2))
+        self.assertRaises(ValueError, self.publisher().restore, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+import os
+from os.path import realpath, dirname, join
+import shutil
+from StringIO import StringIO
+import sys
+import tempfile
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(__file__)), '..', 'src'))
+
+from swallows.engine.farm import Farm
+from swallows.story.generator import build_world_or_estate
+
+CONFIGS = [{'chapters': 1, 'events_per_chapter': 100}]
+
+
+class FarmTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def farm(self, seeds, configs=CONFIGS, compress=False):
+        farm = Farm(self.output_dir, build_world_or_estate,
+                    compress=compress, world_keys=('rooms', 'cast'))
+        resumed = farm.plan(seeds, configs)
+        return (farm, resumed)
+
+    def run_farm(self, farm):
+        log = StringIO()
+        farm.run(log=log)
+        return log.getvalue().splitlines()
+
+    def novels(self):
+        return sorted(name for name in os.listdir(self.output_dir)
+                      if name.endswith('.markdown'))
+
+    def test_resume_skips_finished_novels(self):
+        (farm, resumed) = self.farm([1, 2])
+        self.assertFalse(resumed)
+        self.assertEqual(len(self.run_farm(farm)), 2)
+        novels = self.novels()
+        self.assertEqual(novels, [
+            'seed-1-chapters-1-events-per-chapter-100.markdown',
+            'seed-2-chapters-1-events-per-chapter-100.markdown',
+        ])
+        with open(os.path.join(self.output_dir, novels[0])) as f:
+            text = f.read()
+
+        (farm, resumed) = self.farm([1, 2])
+        self.assertTrue(resumed)
+        self.assertEqual(farm.pending_jobs(), [])
+        self.assertEqual(self.run_farm(farm), [])
+        with open(os.path.join(self.output_dir, novels[0])) as f:
+            self.assertEqual(f.read(), text)
+
+    def test_done_is_decided_by_the_manifest(self):
+        (farm, resumed) = self.farm([1])
+        self.run_farm(farm)
+        os.remove(os.path.join(self.output_dir, self.novels()[0]))
+        (farm, resumed) = self.farm([1])
+        self.assertEqual(farm.pending_jobs(), [])
+
+    def test_new_jobs_are_added_to_the_manifest(self):
+        (farm, resumed) = self.farm([1])
+        self.run_farm(farm)
+        (farm, resumed) = self.farm([1, 2])
+        self.assertTrue(resumed)
+        self.assertEqual([job['seed'] for job in farm.pending_jobs()], [2])
+        self.assertEqual(len(self.run_farm(farm)), 1)
+        self.assertEqual(len(self.novels()), 2)
+
+    def test_refuses_to_resume_with_other_compression(self):
+        (farm, resumed) = self.farm([1])
+        self.assertRaises(ValueError, self.farm, [1], compress=True)
+
+    def test_world_size_is_part_of_the_job(self):
+        configs = [dict(CONFIGS[0], rooms=rooms, cast=3)
+                   for rooms in (10, 20)]
+        (farm, resumed) = self.farm([1], configs)
+        self.run_farm(farm)
+        self.assertEqual(self.novels(), [
+            'seed-1-cast-3-chapters-1-events-per-chapter-100-rooms-10.markdown',
+            'seed-1-cast-3-chapters-1-events-per-chapter-100-rooms-20.markdown',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+from os.path import realpath, dirname, join
+import sys
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(__file__)), '..', 'src'))
+
+from swallows.engine import navigation
+from swallows.engine.objects import Location
+
+
+def corridor(n):
+    """Returns n locations in a row, each leading to the ones next to it."""
+    rooms = [Location('room %d' % i) for i in range(n)]
+    for (i, room) in enumerate(rooms):
+        room.set_exits(*[rooms[j] for j in (i - 1, i + 1) if 0 <= j < n])
+    return rooms
+
+
+class WithinTest(unittest.TestCase):
+    def test_counts_the_fewest_moves(self):
+        rooms = corridor(6)
+        self.assertEqual(navigation.within(rooms[2], 2), {
+            rooms[0]: 2, rooms[1]: 1, rooms[2]: 0, rooms[3]: 1, rooms[4]: 2,
+        })
+
+    def test_no_moves_is_just_where_you_are(self):
+        rooms = corridor(3)
+        self.assertEqual(navigation.within(rooms[1], 0), {rooms[1]: 0})
+
+    def test_takes_the_shortcut(self):
+        rooms = corridor(6)
+        rooms[0].set_exits(rooms[1], rooms[5])
+        rooms[5].set_exits(rooms[4], rooms[0])
+        distances = navigation.within(rooms[0], 10)
+        self.assertEqual(distances[rooms[5]], 1)
+        self.assertEqual(distances[rooms[3]], 3)
+        self.assertEqual(len(distances), 6)
+
+    def test_keeps_nothing(self):
+        rooms = corridor(4)
+        navigation.within(rooms[0], 3)
+        self.assertEqual(rooms[0].routes, None)
+
+
+class RoutesTest(unittest.TestCase):
+    def test_next_hop_and_distance(self):
+        rooms = corridor(5)
+        self.assertEqual(rooms[0].next_hop(rooms[4]), rooms[1])
+        self.assertEqual(rooms[0].distance_to(rooms[4]), 4)
+        self.assertEqual(rooms[3].next_hop(rooms[3]), None)
+        self.assertEqual(rooms[3].distance_to(rooms[3]), 0)
+
+    def test_no_way_there(self):
+        rooms = corridor(3)
+        island = Location('island')
+        self.assertEqual(rooms[0].next_hop(island), None)
+        self.assertEqual(rooms[0].distance_to(island), None)
+
+    def test_changing_exits_throws_away_the_routes_through_them(self):
+        rooms = corridor(5)
+        self.assertEqual(rooms[0].distance_to(rooms[4]), 4)
+        rooms[1].set_exits(rooms[0], rooms[2], rooms[4])
+        self.assertEqual(rooms[0].distance_to(rooms[4]), 2)
+        self.assertEqual(rooms[0].next_hop(rooms[4]), rooms[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
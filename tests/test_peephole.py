@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+from os.path import realpath, dirname, join
+import sys
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(__file__)), '..', 'src'))
+
+from swallows.engine import peephole
+from swallows.engine.events import Event
+from swallows.engine.objects import Location, Male
+
+
+class PeepholeTest(unittest.TestCase):
+    def setUp(self):
+        self.kitchen = Location('kitchen')
+        self.fred = Male('Fred')
+        self.fred.place_in(self.kitchen)
+        self.bob = Male('Bob')
+        self.bob.place_in(self.kitchen)
+
+    def event(self, phrase, *participants):
+        return Event(phrase, list(participants or [self.fred]))
+
+    def test_no_events(self):
+        self.assertEqual(peephole.apply((), None, []), [])
+
+    def test_folding_and_rewriting(self):
+        rules = peephole.RuleSet('test')
+
+        @rules.rule('<1> sat down', '<1> sat down')
+        def fold_sitting(editor, prev, event):
+            return None
+
+        @rules.rule(None, '<1> stood up')
+        def stand_up_smartly(editor, prev, event):
+            return event.rephrase('<1> sprang up')
+
+        events = [self.event('<1> sat down'), self.event('<1> sat down'),
+                  self.event('<1> sat down'), self.event('<1> stood up')]
+        written = peephole.apply((rules,), None, events)
+        self.assertEqual([str(e) for e in written],
+                         ['Fred sat down.', 'Fred sprang up.'])
+
+    def test_rules_are_tried_in_order_on_the_rewritten_event(self):
+        rules = peephole.RuleSet('test')
+        tried = []
+
+        @rules.rule()
+        def first(editor, prev, event):
+            tried.append('first')
+            return event.rephrase('<1> waved')
+
+        @rules.rule(second=('<1> waved', '<1> nodded'))
+        def second(editor, prev, event):
+            tried.append(event.phrase)
+            return event
+
+        events = [self.event('<1> nodded'), self.event('<1> nodded')]
+        written = peephole.apply((rules,), None, events)
+        # `second` applies to the phrase the event had when it arrived
+        self.assertEqual(tried, ['first', '<1> waved'])
+        self.assertEqual([str(e) for e in written],
+                         ['Fred nodded.', 'Fred waved.'])
+
+    def test_the_next_set_sees_the_new_phrase(self):
+        first = peephole.RuleSet('first')
+        second = peephole.RuleSet('second')
+
+        @first.rule(second='<1> greeted <2>')
+        def greet_warmly(editor, prev, event):
+            return event.rephrase('<1> hugged <2>')
+
+        @second.rule(second='<1> hugged <2>')
+        def hug_only_once(editor, prev, event):
+            if prev.phrase == '<1> hugged <2>':
+                return None
+            return event
+
+        events = [self.event('<1> greeted <2>', self.fred, self.bob),
+                  self.event('<1> greeted <2>', self.fred, self.bob),
+                  self.event('<1> greeted <2>', self.fred, self.bob)]
+        written = peephole.apply((first, second), None, events)
+        self.assertEqual([str(e) for e in written],
+                         ['Fred greeted Bob.', 'Fred hugged Bob.'])
+
+    def test_rules_for_is_remembered(self):
+        rules = peephole.RuleSet('test')
+
+        @rules.rule('<1> sat down')
+        def rule(editor, prev, event):
+            return event
+
+        self.assertEqual(rules.rules_for('<1> sat down', '<1> ate'), (rule,))
+        self.assertEqual(rules.rules_for('<1> ate', '<1> sat down'), ())
+        self.assertEqual(len(rules.table), 2)
+
+        # adding a rule starts the table again
+        @rules.rule()
+        def another(editor, prev, event):
+            return event
+
+        self.assertEqual(rules.table, {})
+        self.assertEqual(rules.rules_for('<1> sat down', '<1> ate'),
+                         (rule, another))
+
+
+if __name__ == '__main__':
+    unittest.main()
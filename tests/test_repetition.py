@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+from os.path import realpath, dirname, join
+import sys
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(__file__)), '..', 'src'))
+
+from swallows.engine.events import Editor, Event
+from swallows.engine.objects import Location, Male
+from swallows.engine.repetition import RepetitionWindow
+
+
+class RepetitionWindowTest(unittest.TestCase):
+    def add_all(self, window, fingerprints):
+        window.start()
+        return [window.add(f) for f in fingerprints]
+
+    def test_repeated_too_often(self):
+        window = RepetitionWindow(limit=2, n=2)
+        self.assertEqual(self.add_all(window, [1, 2, 3]), [False] * 3)
+        self.assertEqual(self.add_all(window, [1, 2, 3]), [False] * 3)
+        self.assertEqual(self.add_all(window, [1, 2, 3]),
+                         [False, True, True])
+        # a different pair hasn't been repeated, even if its sentences have
+        self.assertEqual(self.add_all(window, [2, 1]), [False, False])
+
+    def test_does_not_reach_back_past_the_paragraph(self):
+        window = RepetitionWindow(limit=1, n=2)
+        self.assertEqual(self.add_all(window, [1]), [False])
+        self.assertEqual(self.add_all(window, [2]), [False])
+        self.assertEqual(self.add_all(window, [1, 2]), [False, False])
+
+    def test_longer_ngrams(self):
+        window = RepetitionWindow(limit=1, n=3)
+        self.assertEqual(self.add_all(window, [1, 2, 3, 4]), [False] * 4)
+        self.assertEqual(self.add_all(window, [1, 2, 4, 2, 3, 4]),
+                         [False, False, False, False, False, True])
+
+    def test_old_ngrams_leave_the_window(self):
+        window = RepetitionWindow(limit=1, n=2, window=3)
+        self.assertEqual(self.add_all(window, [1, 2]), [False, False])
+        self.assertEqual(self.add_all(window, [1, 2]), [False, True])
+        # pushes out both of the (1, 2)s
+        self.assertEqual(self.add_all(window, [3, 4, 5, 6]), [False] * 4)
+        self.assertEqual(self.add_all(window, [1, 2]), [False, False])
+        self.assertEqual(window.counts[window.recent[-1]], 1)
+        self.assertEqual(len(window.recent), 3)
+
+
+class SuppressRepeatsTest(unittest.TestCase):
+    def setUp(self):
+        kitchen = Location('kitchen')
+        self.fred = Male('Fred')
+        self.fred.place_in(kitchen)
+        self.bob = Male('Bob')
+        self.bob.place_in(kitchen)
+        self.editor = Editor([], [self.fred, self.bob],
+                             repetition=RepetitionWindow(limit=1, n=2))
+
+    def paragraph(self, reply):
+        fred = self.fred
+        bob = self.bob
+        return [
+            Event('<1> yawned', [fred]),
+            Event("'Hello, <2>,' said <1>", [fred, bob]),
+            Event(reply, [bob, fred]),
+        ]
+
+    def suppress(self, events):
+        return [str(e) for e in self.editor.suppress_repeats(events)]
+
+    def test_leaves_out_a_whole_repeated_exchange(self):
+        paragraph = self.paragraph("'Hello, <2>,' replied <1>")
+        self.assertEqual(self.suppress(paragraph), [
+            'Fred yawned.', "'Hello, Bob,' said Fred.",
+            "'Hello, Fred,' replied Bob.",
+        ])
+        self.assertEqual(self.suppress(paragraph), ['Fred yawned.'])
+
+    def test_keeps_what_a_new_reply_answers(self):
+        self.suppress(self.paragraph("'Hello, <2>,' replied <1>"))
+        self.assertEqual(self.suppress(self.paragraph('<1> ignored <2>')), [
+            'Fred yawned.', "'Hello, Bob,' said Fred.", 'Bob ignored Fred.',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
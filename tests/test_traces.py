@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+from os.path import realpath, dirname, join
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(__file__)), '..', 'src'))
+
+from swallows.engine.events import Publisher
+from swallows.engine.sinks import MemorySink
+from swallows.engine.traces import RecordingPublisher, ReplayingPublisher
+from swallows.story.world import build_world
+
+
+def publish(publisher_class, seed, **kwargs):
+    rng = random.Random(seed)
+    world = build_world(rng=rng)
+    sink = MemorySink()
+    publisher = publisher_class(
+        characters=world.characters,
+        setting=world.setting,
+        chapters=3,
+        events_per_chapter=150,
+        rng=rng,
+        sink=sink,
+        max_repeats=2,
+        **kwargs
+    )
+    publisher.publish()
+    return sink.getvalue()
+
+
+class TracesTest(unittest.TestCase):
+    def setUp(self):
+        self.trace_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.trace_dir)
+
+    def test_replay_gives_the_same_novel(self):
+        text = publish(Publisher, 7)
+        self.assertEqual(
+            publish(RecordingPublisher, 7, trace_dir=self.trace_dir), text
+        )
+        # the world it's replayed in is built with another seed, so the
+        # text can only have come from the traces
+        self.assertEqual(
+            publish(ReplayingPublisher, 8, trace_dir=self.trace_dir), text
+        )
+        self.assertNotEqual(publish(Publisher, 8), text)
+
+
+if __name__ == '__main__':
+    unittest.main()